@@ -0,0 +1,265 @@
+'''
+Solves many sudokus at once with NumPy, so that the time spent running Python
+is shared between all of them rather than spent again on every sudoku.
+
+The sudokus of a batch are held in a (K, 81) array of values, and their
+possibilities in a (K, 81) array of masks as in Board, or the same for 16x16
+and 25x25 sudokus. One possibility, only instance and box line intersection
+checks are each a handful of array operations over the whole batch, repeated
+until none of them changes anything in any sudoku. Sudokus still not solved
+after that are finished one at a time by Grid.brute_force, starting from the
+possibilities left.
+
+'''
+
+from functools import lru_cache
+
+import numpy as np
+
+import sudoku
+
+
+@lru_cache(maxsize=None)
+def _tables(size):
+
+    '''
+    Returns, for sudokus of size values, an array of the positions of every
+    subgrid, and an array of the subgrids of every position, as in Layout.
+
+    '''
+
+    layout = sudoku._layout(size)
+    subgrids = np.array(layout.subgrids, dtype=np.intp)
+    cell_subgrids = np.array(layout.cell_subgrids, dtype=np.intp).reshape(-1, 3)
+    return subgrids, cell_subgrids
+
+
+def _seen(masks, axis):
+
+    '''
+    Returns masks of the possibilities found along axis of masks at least once,
+    and of those found more than once.
+
+    '''
+
+    seen_once = np.zeros_like(masks.take(0, axis))
+    seen_twice = np.zeros_like(seen_once)
+
+    for i in range(masks.shape[axis]):
+        mask = masks.take(i, axis)
+        seen_twice |= seen_once & mask
+        seen_once |= mask
+
+    return seen_once, seen_twice
+
+
+def _others(masks, axis):
+
+    '''
+    Returns, for every entry along axis of masks, the OR of every other entry.
+
+    '''
+
+    return np.stack(
+        [
+            np.bitwise_or.reduce(np.delete(masks, i, axis), axis=axis)
+            for i in range(masks.shape[axis])
+        ],
+        axis=axis,
+    )
+
+
+def _one_possibility(cands, subgrids, cell_subgrids):
+
+    '''
+    Removes the value of every position with only one possibility from the
+    possibilities of every adjacent position. Returns the new possibilities, and
+    which sudokus have two positions with the same value in a subgrid.
+
+    '''
+
+    single = (cands & (cands - 1)) == 0
+    placed = np.where(single, cands, 0)
+
+    used, twice = _seen(placed[:, subgrids], 2)
+    revealed = np.bitwise_or.reduce(used[:, cell_subgrids], axis=2)
+
+    cands = np.where(single, cands, cands & ~revealed)
+    return cands, (twice != 0).any(axis=1)
+
+
+def _only_instance(cands, subgrids, all_values):
+
+    '''
+    Gives every position which is the only one in a subgrid where a value is
+    possible that value alone. Returns the new possibilities, and which sudokus
+    have a subgrid where some value is not possible anywhere.
+
+    '''
+
+    k, cells = cands.shape
+    size = subgrids.shape[1]
+
+    in_subgrids = cands[:, subgrids]
+    seen_once, seen_twice = _seen(in_subgrids, 2)
+    only = in_subgrids & (seen_once & ~seen_twice)[:, :, None]
+
+    # Every position is in exactly one subgrid of each kind, so each kind can
+    # be put back by position without two subgrids writing to the same one.
+    found = np.zeros_like(cands)
+    for kind in range(3):
+        kind_subgrids = slice(kind * size, kind * size + size)
+        found[:, subgrids[kind_subgrids].reshape(-1)] |= only[
+            :, kind_subgrids
+        ].reshape(k, cells)
+
+    cands = np.where(found != 0, cands & found, cands)
+    return cands, (seen_once != all_values).any(axis=1)
+
+
+def _box_line(grid, box):
+
+    '''
+    Applies box line intersection to the rows of grid, a (K, rows, columns)
+    array of possibilities, and returns the result. Where a value of a row is
+    only possible within one box, it is removed from the rest of that box, and
+    where a value of a box is only possible within one row, it is removed from
+    the rest of that row.
+
+    '''
+
+    k, size = grid.shape[0], grid.shape[1]
+
+    # The possibilities of the positions a row shares with every box, as
+    # (K, band, row within band, stack).
+    segments = np.bitwise_or.reduce(grid.reshape(k, size, box, box), axis=3)
+    segments = segments.reshape(k, box, box, box)
+
+    seen_once, seen_twice = _seen(segments, 3)
+    within_box = segments & (seen_once & ~seen_twice)[:, :, :, None]
+    seen_once, seen_twice = _seen(segments, 2)
+    within_row = segments & (seen_once & ~seen_twice)[:, :, None, :]
+
+    # A segment loses a value when another row of its box has the value only
+    # within the box, or another box of its row has the value only in the row.
+    remove = _others(within_box, 2) | _others(within_row, 3)
+
+    remove = remove.reshape(k, size, box, 1)
+    return (grid.reshape(k, size, box, box) & ~remove).reshape(grid.shape)
+
+
+def propagate(values):
+
+    '''
+    Applies the checks to every sudoku in values, a (K, cells) array of values
+    with 0 meaning no value, until none changes anything. For every sudoku, the
+    checks of initial_checks are exhausted before box line intersection is
+    tried, and only sudokus the last round changed are checked again.
+    Returns the (K, cells) array of possibilities left, along with arrays of
+    whether the initial checks and box line intersection changed anything in
+    every sudoku, and whether a sudoku was found to have no solution.
+
+    '''
+
+    k, cells = values.shape
+    layout = sudoku._layout(sudoku._SIZES[cells])
+    subgrids, cell_subgrids = _tables(layout.size)
+
+    dtype = np.uint16 if layout.size <= 16 else np.uint32
+    cands = np.where(values > 0, 1 << np.maximum(values - 1, 0), layout.all)
+    cands = cands.astype(dtype)
+    all_values = dtype(layout.all)
+
+    initial = np.zeros(k, dtype=bool)
+    advanced = np.zeros(k, dtype=bool)
+    failed = np.zeros(k, dtype=bool)
+    active = np.arange(k)
+
+    while active.size:
+        before = cands[active]
+
+        work, duplicated = _one_possibility(before, subgrids, cell_subgrids)
+        work, missing = _only_instance(work, subgrids, all_values)
+        failed[active] |= duplicated | missing
+
+        changed = (work != before).any(axis=1)
+        initial[active] |= changed
+        cands[active] = work
+
+        # Sudokus the initial checks did not change try box line
+        # intersection, and are finished if that changes nothing either.
+        still = active[~changed]
+        before = cands[still]
+
+        grid = before.reshape(-1, layout.size, layout.size)
+        grid = _box_line(grid, layout.box_size)
+        grid = _box_line(grid.swapaxes(1, 2), layout.box_size).swapaxes(1, 2)
+        work = grid.reshape(-1, cells)
+
+        box_changed = (work != before).any(axis=1)
+        advanced[still] |= box_changed
+        cands[still] = work
+
+        active = np.concatenate((active[changed], still[box_changed]))
+        active = active[~failed[active]]
+
+    failed |= (cands == 0).any(axis=1)
+    return cands, initial, advanced, failed
+
+
+def solve(input_grids):
+
+    '''
+    Solves every input grid in input_grids, tuples of values as taken by solve in
+    sudoku.py, of any mix of sizes. Returns a list with, for every input grid,
+    None if it has no solution, otherwise a tuple of its solution and of whether
+    the checks of initial_checks, box line intersection and brute_force were
+    required, as taken by _explain in sudoku.py. Sudokus with one
+    solution are given the same solution as by sudoku.solve.
+
+    '''
+
+    # Sudokus of each size are solved as a batch of their own.
+    sizes = {}
+    for i, input_grid in enumerate(input_grids):
+        sizes.setdefault(len(input_grid), []).append(i)
+
+    results = [None] * len(input_grids)
+    for indices in sizes.values():
+        solved = _solve_same_size([input_grids[i] for i in indices])
+        for i, result in zip(indices, solved):
+            results[i] = result
+
+    return results
+
+
+def _solve_same_size(input_grids):
+    values = np.array(input_grids, dtype=np.int64)
+    cands, initial, advanced, failed = propagate(values)
+
+    single = (cands & (cands - 1)) == 0
+    solved = single.all(axis=1) & ~failed
+    solutions = np.where(single, np.log2(np.maximum(cands, 1)).astype(int) + 1, 0)
+
+    results = []
+    for i in range(len(input_grids)):
+        levels = (bool(initial[i]), bool(advanced[i]), False)
+
+        if failed[i]:
+            results.append(None)
+
+        elif solved[i]:
+            results.append((tuple(solutions[i].tolist()), levels))
+
+        else:
+            # Positions with one possibility left are given that value, and
+            # every other position keeps the possibilities left by propagate.
+            grid = sudoku.Grid(tuple(solutions[i].tolist()))
+            grid.board.cands[:] = cands[i].tolist()
+
+            if grid.brute_force():
+                results.append((grid.solution, levels[:2] + (True,)))
+            else:
+                results.append(None)
+
+    return results
@@ -0,0 +1,351 @@
+'''
+Measures how quickly sudoku.py solves a number of corpora of sudokus, and how
+its time is split between initial_checks, advanced_checks and brute_force.
+
+Run with:
+
+    python bench.py [corpus ...] [--json results.json] [--compare old.json]
+
+where each corpus is one of the names in CORPORA or a path to a .sdk file.
+
+'''
+
+import argparse, json, pathlib, platform, random, statistics, subprocess, sys, time
+import tracemalloc
+
+import generate, server, sudoku
+
+# Sudokus bundled so that every run measures the same hard cases.
+HARD = (
+    "800000000003600000070090200050007000000045700000100030001000068008500010090000400",
+    "400000805030000000000700000020000060000080400000010000000603070500200000104000000",
+    "100007090030020008009600500005300900010080002600004000300000010040000007007000300",
+)
+SEVENTEEN = (
+    "000000010400000000020000000000050407008000300001090000300400200050100000000806000",
+    "000000012000035000000600070700000300000400800100000000000120000080000040050000600",
+    "000000012003600000000007000410020000000500300700000600280000040000300500000000000",
+)
+# The solution's first row is 987654321, so trying the values of every Square in
+# order from 1 to 9 takes as long as possible.
+PATHOLOGICAL = (
+    "000000000000003085001020000000507000004000100090000000500000073002010000000040009",
+)
+
+# The solution to the first of sample_sudoku.sdk, from which the generated
+# corpora are made.
+_SOLVED = (
+    "962415378374928561185763429753284196218396745496157832531672984649831257827549613"
+)
+
+
+def _line(grid):
+    return "".join(sudoku._CHARS[value] for value in grid)
+
+
+def _puzzle(rng, clues=0):
+
+    '''
+    Returns a random sudoku with one solution, made from _SOLVED by
+    generate.shuffle and generate.remove_clues, as a line of a .sdk file.
+
+    '''
+
+    grid = generate.shuffle(sudoku._parse_line(0, _SOLVED), rng)
+    return _line(generate.remove_clues(grid, rng, clues=clues))
+
+
+def against_backtracking(grid):
+
+    '''
+    Relabels the values of grid so that, read left to right, top to bottom, the
+    empty positions of the solution are filled with values as high as possible.
+    Trying values in order from 1 to 9 then finds each as late as possible.
+
+    '''
+
+    solved = sudoku.Grid(tuple(int(char) for char in grid))
+    solved.brute_force()
+
+    labels = {}
+    for char, value in zip(grid, solved.solution):
+        if char == "0" and value not in labels:
+            labels[value] = 9 - len(labels)
+
+    for value in range(1, 10):
+        if value not in labels:
+            labels[value] = 9 - len(labels)
+
+    return "".join(str(labels[int(char)]) if char != "0" else "0" for char in grid)
+
+
+def _easy(rng, count):
+    return [_puzzle(rng, 36) for _ in range(count)]
+
+
+def _hard(rng, count):
+    generated = [_puzzle(rng) for _ in range(count - len(HARD))]
+    return list(HARD[:count]) + generated
+
+
+def _seventeen(rng, count):
+    grids = [sudoku._parse_line(0, line) for line in SEVENTEEN]
+    return [_line(generate.shuffle(grids[i % len(grids)], rng)) for i in range(count)]
+
+
+def _pathological(rng, count):
+    generated = [
+        against_backtracking(_puzzle(rng)) for _ in range(count - len(PATHOLOGICAL))
+    ]
+    return list(PATHOLOGICAL[:count]) + generated
+
+
+# Every corpus is made from a seeded random number generator, so the same
+# sudokus are measured on every run and results can be compared between
+# commits.
+CORPORA = {
+    "easy": _easy,
+    "hard": _hard,
+    "17-clue": _seventeen,
+    "pathological": _pathological,
+}
+
+
+def load_corpus(name, count, seed):
+    if name in CORPORA:
+        return CORPORA[name](random.Random(f"{name}-{seed}"), count)
+
+    with open(name) as reader:
+        return [line.strip() for line in reader if line.strip()]
+
+
+def run_corpus(grids, incremental=False, engine="grid"):
+
+    '''
+    Solves every sudoku in grids, returning a dict of the results: how many were
+    solved per second, the median and 99th percentile time taken to solve one,
+    the peak memory allocated while solving one, and the total time spent in
+    each method timed by sudoku.solve.
+    If engine is "batch", every sudoku is solved at once, so the time taken to
+    solve one is only known on average, and is given as both the median and the
+    99th percentile.
+
+    '''
+
+    input_grids = [sudoku._parse_line(i, grid) for i, grid in enumerate(grids)]
+    timings, latencies = {}, []
+
+    if engine == "batch":
+        # Solving one sudoku first imports numpy, which is not timed.
+        sudoku._solve_batch(input_grids[:1])
+
+    start = time.perf_counter()
+    if engine == "batch":
+        sudoku._solve_batch(input_grids)
+    else:
+        for input_grid in input_grids:
+            solve_start = time.perf_counter()
+            sudoku.solve(input_grid, incremental, engine, timings)
+            latencies.append(time.perf_counter() - solve_start)
+    elapsed = time.perf_counter() - start
+
+    if engine == "batch":
+        timings["batch"] = elapsed
+        latencies = [elapsed / len(input_grids)] * len(input_grids)
+
+    # Tracing every allocation slows solving down, so memory is measured on a
+    # separate pass which is not timed.
+    tracemalloc.start()
+    peak = 0
+    for input_grid in [input_grids] if engine == "batch" else input_grids:
+        tracemalloc.reset_peak()
+        if engine == "batch":
+            sudoku._solve_batch(input_grid)
+        else:
+            sudoku.solve(input_grid, incremental, engine)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    return {
+        "count": len(input_grids),
+        "puzzles_per_sec": len(input_grids) / elapsed,
+        "p50_ms": 1000 * statistics.median(latencies),
+        "p99_ms": 1000 * server._percentile(sorted(latencies), 99),
+        "peak_kib": peak / 1024,
+        "phases_s": timings,
+    }
+
+
+def time_to_first_solution(runs):
+
+    '''
+    Returns a dict of the median time, over runs runs, taken by sudoku.py in a
+    new process to read, solve and write the first of HARD, from starting the
+    process to it exiting, and of the time taken by the interpreter alone to
+    start and exit, both in milliseconds.
+
+    '''
+
+    script = pathlib.Path(__file__).parent / "sudoku.py"
+
+    def median_ms(command, **kwargs):
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run(command, stdout=subprocess.DEVNULL, check=True, **kwargs)
+            times.append(time.perf_counter() - start)
+        return 1000 * statistics.median(times)
+
+    return {
+        "first_solution_ms": median_ms(
+            (sys.executable, str(script), "-", "-", "--quiet"),
+            input=HARD[0] + "\n",
+            text=True,
+        ),
+        "interpreter_ms": median_ms((sys.executable, "-c", "pass")),
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ("git", "rev-parse", "--short", "HEAD"),
+            cwd=pathlib.Path(__file__).parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_results(results, baseline=None):
+    print(
+        f"{'corpus':<16}{'count':>7}{'puzzles/s':>12}{'p50 ms':>10}{'p99 ms':>10}"
+        f"{'peak KiB':>10}  phases"
+    )
+
+    for name, result in results["corpora"].items():
+        phases = ", ".join(
+            f"{phase} {seconds:.3f}s" for phase, seconds in result["phases_s"].items()
+        )
+        print(
+            f"{name:<16}{result['count']:>7}{result['puzzles_per_sec']:>12.1f}"
+            f"{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+            f"{result['peak_kib']:>10.1f}  {phases}"
+        )
+
+        if baseline and name in baseline["corpora"]:
+            old = baseline["corpora"][name]
+            print(
+                f"{'':<16}{'vs':>7}"
+                f"{result['puzzles_per_sec'] / old['puzzles_per_sec']:>11.2f}x"
+                f"{result['p50_ms'] / old['p50_ms']:>9.2f}x"
+                f"{result['p99_ms'] / old['p99_ms']:>9.2f}x"
+                f"{result['peak_kib'] / old['peak_kib']:>9.2f}x"
+                f"  {baseline.get('commit')}"
+            )
+
+    if "startup" in results:
+        startup = results["startup"]
+        print(
+            f"time to first solution {startup['first_solution_ms']:.1f} ms, "
+            f"interpreter alone {startup['interpreter_ms']:.1f} ms"
+        )
+
+        if baseline and "startup" in baseline:
+            old = baseline["startup"]["first_solution_ms"]
+            print(
+                f"{'vs':>23}{startup['first_solution_ms'] / old:>6.2f}x"
+                f"  {baseline.get('commit')}"
+            )
+
+
+def _parse_args(parser, args=None):
+
+    parser.add_argument(
+        "corpora",
+        help="Names of generated corpora or paths to .sdk files. Defaults to every "
+        "generated corpus.",
+        nargs="*",
+        default=list(CORPORA),
+    )
+    parser.add_argument(
+        "--count",
+        help="The number of sudokus in each generated corpus.",
+        type=int,
+        default=50,
+    )
+    parser.add_argument(
+        "--seed",
+        help="Seeds the generated corpora. Only compare runs with the same seed.",
+        default="0",
+    )
+    parser.add_argument("--incremental", action="store_true")
+    parser.add_argument("--engine", choices=("grid", "dlx", "batch"), default="grid")
+    parser.add_argument(
+        "--json",
+        help="A path to write the results to, for comparing between commits.",
+    )
+    parser.add_argument(
+        "--compare",
+        help="A path to results written by an earlier run with --json.",
+    )
+    parser.add_argument(
+        "--startup",
+        help="Also time sudoku.py solving one sudoku in a new process, this many "
+        "times, reporting the median.",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "--write-corpora",
+        help="A directory to write every corpus to as a .sdk file, then exit.",
+    )
+    return parser.parse_args(args)
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    args = _parse_args(parser)
+
+    corpora = {name: load_corpus(name, args.count, args.seed) for name in args.corpora}
+
+    if args.write_corpora:
+        directory = pathlib.Path(args.write_corpora)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name, grids in corpora.items():
+            path = directory / f"{pathlib.Path(name).stem}.sdk"
+            path.write_text("\n".join(grids))
+        return
+
+    results = {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "engine": args.engine,
+        "incremental": args.incremental,
+        "seed": args.seed,
+        "corpora": {
+            name: run_corpus(grids, args.incremental, args.engine)
+            for name, grids in corpora.items()
+        },
+    }
+
+    if args.startup > 0:
+        results["startup"] = time_to_first_solution(args.startup)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as reader:
+            baseline = json.load(reader)
+
+    _print_results(results, baseline)
+
+    if args.json:
+        with open(args.json, "w") as writer:
+            json.dump(results, writer, indent=2)
+
+
+if __name__ == "__main__":
+    main()
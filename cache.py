@@ -0,0 +1,137 @@
+'''
+Remembers the solutions of sudokus by their canonical form, so that a sudoku
+seen before, or one equivalent to it, does not have to be solved again.
+
+'''
+
+from collections import OrderedDict
+import json, sqlite3
+
+import canon, sudoku
+
+
+class SolutionCache:
+    def __init__(self, size=4096, path=None):
+
+        '''
+        Remembers the solutions of up to size sudokus in memory, forgetting the
+        least recently used first. If path is given, every solution is also kept
+        in a sqlite database at path, which is checked for any sudoku not found
+        in memory, so that solutions are kept between runs and shared between
+        processes. Sudokus whose canonical form canon.canonicalize gives up on,
+        such as those with nearly every value given, are never remembered, as
+        they take far less time to solve than to canonicalize.
+        self.hits and self.misses count the sudokus which were and were not
+        found.
+
+        '''
+
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+
+        # The canonical form of the last sudoku looked up, which is usually the
+        # next to be put after solving it.
+        self.last = None
+
+        if path is not None:
+            self.db = sqlite3.connect(path, timeout=30, isolation_level=None)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS solutions "
+                "(puzzle TEXT PRIMARY KEY, solution TEXT, levels TEXT)"
+            )
+
+    def get(self, input_grid):
+
+        '''
+        Returns the solution to input_grid, a tuple of 81, 256 or 625 values read
+        left to right, top to bottom, along with the levels of checking that solving it
+        required, if it or an equivalent sudoku has been solved. Otherwise returns
+        None.
+
+        '''
+
+        canonical = self._canonicalize(input_grid)
+        entry = None if canonical is None else self._lookup(canonical[0])
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        solution, levels = entry
+        return canonical[1].invert(solution), levels
+
+    def put(self, input_grid, solution, levels):
+
+        '''
+        Remembers solution, the solution to input_grid, and levels, the levels of
+        checking that solving it required.
+
+        '''
+
+        canonical = self._canonicalize(input_grid)
+        if canonical is None:
+            return
+
+        key, transform = canonical
+        solution = transform.apply(solution)
+        self._remember(key, (solution, levels))
+
+        if self.db is not None:
+            self.db.execute(
+                "INSERT OR REPLACE INTO solutions VALUES (?, ?, ?)",
+                (_to_line(key), _to_line(solution), json.dumps(levels)),
+            )
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def _canonicalize(self, input_grid):
+        input_grid = tuple(input_grid)
+
+        if self.last is None or self.last[0] != input_grid:
+            self.last = (input_grid, canon.canonicalize(input_grid))
+
+        return self.last[1]
+
+    def _lookup(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+        if self.db is None:
+            return None
+
+        row = self.db.execute(
+            "SELECT solution, levels FROM solutions WHERE puzzle = ?", (_to_line(key),)
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        levels = json.loads(row[1])
+        entry = (_from_line(row[0]), tuple(levels) if levels is not None else None)
+        self._remember(key, entry)
+        return entry
+
+    def _remember(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+
+def _to_line(grid):
+    return "".join(sudoku._CHARS[value] for value in grid)
+
+
+def _from_line(line):
+    return tuple(sudoku._CHARS.index(char) for char in line)
@@ -0,0 +1,368 @@
+'''
+Finds the canonical form of a sudoku: of every sudoku equivalent to it, the one
+whose values, read left to right, top to bottom, come first in lexicographic
+order. Two sudokus are equivalent when one can be made from the other by
+relabelling the values, swapping rows within a band, swapping bands, swapping
+columns within a stack, swapping stacks and transposing. Equivalent sudokus
+have equivalent solutions, so a solution of one can be mapped onto the other.
+
+Rows of the canonical form are chosen one at a time. Of the orders of the
+columns still possible, only those giving the smallest row are kept, which is
+found by sorting rather than trying every order. Columns which have had no
+value in any row so far can still be swapped with each other, and are kept
+together until a row tells them apart, as are stacks with no value so far.
+Every row which could come next is first only compared, and the ways of
+ordering the columns after it are only worked out for the smallest. Only where
+equally small rows label the values differently does the search branch, and
+branches which have used the same rows, in any order, to reach the same columns
+and labels are merged. Branching is rare for puzzles, but a sudoku with nearly
+every value given has a great many equally small rows, so canonicalize gives up
+once more than LIMIT branches would be kept. 16x16 and 25x25 sudokus are found
+the same way, with bands and stacks of four or five.
+
+'''
+
+from collections import Counter
+from itertools import permutations, product
+from math import factorial
+
+# The most ways of reaching the smallest rows so far canonicalize keeps by
+# default. Puzzles seldom need more than a few dozen, while a solved 9x9 sudoku
+# needs tens of thousands and a solved 16x16 one hundreds of millions.
+LIMIT = 4096
+
+# Sorts after every label, even of a 25x25 sudoku, standing in for a value not
+# yet given a label.
+_NEW = 26
+
+
+class Transform:
+    def __init__(self, transpose, rows, cols, labels):
+
+        '''
+        Describes how a sudoku maps onto its canonical form. If transpose is
+        True, the sudoku is transposed first. Row i of the canonical form is then
+        row rows[i] of the sudoku, column j is column cols[j], and the value n
+        becomes labels[n], with labels[0] being 0.
+
+        '''
+
+        self.transpose = transpose
+        self.rows = tuple(rows)
+        self.cols = tuple(cols)
+        self.labels = tuple(labels)
+
+    def apply(self, grid):
+
+        '''
+        Returns grid, a tuple of 81, 256 or 625 values read left to right, top to
+        bottom, mapped onto the canonical form.
+
+        '''
+
+        if self.transpose:
+            grid = _transposed(grid)
+
+        size = len(self.rows)
+        return tuple(
+            self.labels[grid[row * size + col]]
+            for row in self.rows
+            for col in self.cols
+        )
+
+    def invert(self, grid):
+
+        '''
+        Returns grid, in the canonical form, mapped back onto the original, so
+        that self.invert(self.apply(grid)) == grid.
+
+        '''
+
+        unlabels = [0] * len(self.labels)
+        for value, label in enumerate(self.labels):
+            unlabels[label] = value
+
+        size = len(self.rows)
+        original = [0] * len(grid)
+        for i, row in enumerate(self.rows):
+            for j, col in enumerate(self.cols):
+                original[row * size + col] = unlabels[grid[i * size + j]]
+
+        if self.transpose:
+            return _transposed(original)
+
+        return tuple(original)
+
+
+def _transposed(grid):
+    size = int(len(grid) ** 0.5)
+    return tuple(grid[col * size + row] for row in range(size) for col in range(size))
+
+
+def _arrange_group(columns, keys, split=True):
+
+    '''
+    Orders columns, a group of columns which could be in any order, to give the
+    smallest row, where keys gives the key of every column. Returns that row, and
+    every way of splitting the group for the next row: columns with no value
+    stay together, and every other column is fixed in place. Columns with
+    values not yet labelled can be in any order, but each order labels the
+    values differently, so each is a separate way. If split is False, only the
+    row is worked out, and None is returned in place of the ways.
+
+    '''
+
+    # Keys sort as the columns are placed: no value, labelled, then new.
+    if not split:
+        return sorted([keys[col] for col in columns]), None
+
+    empty, labelled, new = [], [], []
+    for col in columns:
+        key = keys[col]
+        if key == 0:
+            empty.append(col)
+        elif key == _NEW:
+            new.append(col)
+        else:
+            labelled.append(col)
+
+    labelled.sort(key=keys.__getitem__)
+    row = [0] * len(empty) + [keys[col] for col in labelled] + [_NEW] * len(new)
+    head = [empty] if empty else []
+    head += [[col] for col in labelled]
+
+    splits = [head + [[col] for col in order] for order in permutations(new)]
+    return row, splits
+
+
+def _arrange_stack(groups, keys, split=True):
+
+    '''
+    Orders the columns of a stack, given as its groups of columns in order, to
+    give the smallest row. Returns that row and every way of splitting the groups
+    for the next row, as lists of groups, or None if split is False.
+
+    '''
+
+    row, alternatives = [], []
+    for columns in groups:
+        group_row, splits = _arrange_group(columns, keys, split)
+        row += group_row
+        alternatives.append(splits)
+
+    if not split:
+        return row, None
+
+    splits = [sum(choice, []) for choice in product(*alternatives)]
+    return row, splits
+
+
+def _arrange(stacks, keys, split=True):
+
+    '''
+    Orders the columns, given as stacks, to give the smallest row. Every item of
+    stacks is either ("stack", groups), a stack in a fixed place whose columns
+    are in groups as for _arrange_stack, or ("empty", columns), a list of the
+    columns of stacks with no values so far, which could be in any order.
+    Returns that row and every way of describing the columns for the next row in
+    the same form, or None if split is False, which is much quicker.
+
+    '''
+
+    row, alternatives = [], []
+
+    for kind, columns in stacks:
+        if kind == "stack":
+            stack_row, splits = _arrange_stack(columns, keys, split)
+            row += stack_row
+            if split:
+                alternatives.append([[("stack", groups)] for groups in splits])
+            continue
+
+        arranged = sorted(
+            (_arrange_stack([stack], keys, split) + (stack,) for stack in columns),
+            key=lambda arrangement: arrangement[0],
+        )
+
+        if not split:
+            row += sum((stack_row for stack_row, _, _ in arranged), [])
+            continue
+
+        # Stacks giving the same part of the row can be in either order. If that
+        # part is empty they stay together, otherwise every order is a
+        # separate way, as each labels the values differently.
+        parts = []
+        i = 0
+        while i < len(arranged):
+            j = i
+            while j < len(arranged) and arranged[j][0] == arranged[i][0]:
+                j += 1
+            tied = arranged[i:j]
+            row += sum((stack_row for stack_row, _, _ in tied), [])
+
+            if not any(tied[0][0]):
+                parts.append([[("empty", [stack for _, _, stack in tied])]])
+            else:
+                parts.append(
+                    [
+                        [("stack", split) for split in choice]
+                        for order in permutations(tied)
+                        for choice in product(*(splits for _, splits, _ in order))
+                    ]
+                )
+            i = j
+
+        alternatives.append([sum(choice, []) for choice in product(*parts)])
+
+    if not split:
+        return row, None
+
+    return row, [sum(choice, []) for choice in product(*alternatives)]
+
+
+def _ways(stacks, keys):
+
+    '''
+    Returns the number of ways of describing the columns for the next row that
+    _arrange gives for stacks and keys, without working them out.
+
+    '''
+
+    ways = 1
+
+    for kind, columns in stacks:
+        if kind == "stack":
+            for group in columns:
+                if len(group) > 1:
+                    ways *= factorial(sum(keys[col] == _NEW for col in group))
+            continue
+
+        # Stacks with values giving the same part of the row can be in any order.
+        tied = Counter()
+        for stack in columns:
+            part = tuple(sorted(keys[col] for col in stack))
+            if any(part):
+                tied[part] += 1
+                ways *= factorial(part.count(_NEW))
+
+        for count in tied.values():
+            ways *= factorial(count)
+
+    return ways
+
+
+def _column_order(stacks):
+    cols = []
+    for kind, columns in stacks:
+        if kind == "stack":
+            cols += [col for group in columns for col in sorted(group)]
+        else:
+            cols += [col for stack in columns for col in sorted(stack)]
+    return cols
+
+
+def canonicalize(grid, limit=LIMIT):
+
+    '''
+    Returns the canonical form of grid, a tuple of 81, 256 or 625 values read
+    left to right, top to bottom with 0 meaning no value, along with a Transform
+    mapping grid onto it. Where several Transforms do, any one is returned.
+    Returns None instead if more than limit ways of reaching the smallest rows
+    would have to be kept at once, as for sudokus with nearly every value
+    given, unless limit is None.
+
+    '''
+
+    # Every state is a way of reaching the smallest rows so far: whether the
+    # sudoku was transposed, the rows chosen, the columns as described in
+    # _arrange, and the labels given to values.
+    size = int(len(grid) ** 0.5)
+    box = int(size ** 0.5)
+    stacks = [("empty", [list(range(i, i + box)) for i in range(0, size, box)])]
+    states = [
+        (False, tuple(grid), (), stacks, {}),
+        (True, _transposed(grid), (), stacks, {}),
+    ]
+    canonical = []
+
+    for i in range(size):
+        best_row, candidates = None, []
+
+        for state in states:
+            transpose, values, rows, stacks, labels = state
+
+            # A new band may start with any row of a band not yet used,
+            # otherwise the row comes from the band already started.
+            if i % box == 0:
+                used = set(row // box for row in rows)
+                choices = [row for row in range(size) if row // box not in used]
+            else:
+                band = rows[-1] // box
+                choices = [row for row in range(band * box, band * box + box)]
+                choices = [row for row in choices if row not in rows]
+
+            for row in choices:
+                line = values[row * size : row * size + size]
+                keys = [labels.get(value, _NEW) if value else 0 for value in line]
+                row_keys, _ = _arrange(stacks, keys, split=False)
+
+                if best_row is not None and row_keys > best_row:
+                    continue
+
+                if best_row is None or row_keys < best_row:
+                    best_row, candidates = row_keys, []
+
+                candidates.append((state, row, line, keys))
+
+        if limit is not None:
+            ways = sum(_ways(state[3], keys) for state, _, _, keys in candidates)
+            if ways > limit:
+                return None
+
+        # Only the rows which are smallest are split, most rows tried not being.
+        # States using the same rows in a different order, with the same
+        # columns and labels, can only go on to the same rows, so only the
+        # first is kept, as when equal rows can be chosen in either order. The
+        # splits of one row all differ, so there is nothing to merge for one.
+        states, seen = [], set()
+        for (transpose, values, rows, stacks, labels), row, line, keys in candidates:
+            for split in _arrange(stacks, keys)[1]:
+                new_labels = dict(labels)
+                for col in _column_order(split):
+                    if line[col] and line[col] not in new_labels:
+                        new_labels[line[col]] = len(new_labels) + 1
+
+                if len(candidates) > 1:
+                    key = (
+                        transpose,
+                        frozenset(rows + (row,)),
+                        repr(split),
+                        tuple(new_labels.items()),
+                    )
+                    if key in seen:
+                        continue
+                    seen.add(key)
+
+                states.append((transpose, values, rows + (row,), split, new_labels))
+
+        transpose, values, rows, stacks, labels = states[0]
+        line = values[rows[-1] * size : rows[-1] * size + size]
+        canonical += [
+            labels[line[col]] if line[col] else 0 for col in _column_order(stacks)
+        ]
+
+    transpose, values, rows, stacks, labels = states[0]
+
+    # Values which never appear are given the labels left over, so that the
+    # Transform also maps solutions.
+    for value in range(1, size + 1):
+        if value not in labels:
+            labels[value] = len(labels) + 1
+
+    transform = Transform(
+        transpose,
+        rows,
+        _column_order(stacks),
+        [0] + [labels[value] for value in range(1, size + 1)],
+    )
+    return tuple(canonical), transform
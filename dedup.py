@@ -0,0 +1,257 @@
+'''
+Removes sudokus which are the same as one seen earlier in a .sdk file, apart
+from relabelling the values, swapping rows, columns, bands or stacks, or
+transposing, so that each is only solved once.
+
+Run with:
+
+    python dedup.py <path/to/input.sdk> <path/to/output.sdk> [--workers N]
+
+The first of every set of equivalent sudokus is written to the output file, in
+the order they are read. A mapping file, by default the output path with the
+suffix .map, gets a line for every line of the input, holding the number of the
+line of the output file its sudoku was written to, 0 being the first, or
+invalid for a line which is not a sudoku, so every sudoku of the input can be
+found again from the output.
+
+Sudokus are compared by a hash of their canonical form (see canon.py), found in
+worker processes. Sudokus with nearly every value given, whose canonical form
+takes too long to find, are only compared with exact copies of themselves. The hashes seen so far are kept in memory, up to --memory of
+them, after which they are all moved to a sqlite database on disk, which is
+checked for any hash not found in memory, so that files of any size can be read
+a line at a time.
+
+'''
+
+from collections import deque
+import argparse, contextlib, hashlib, multiprocessing, os, pathlib, sqlite3, sys
+import tempfile, time
+
+import canon, sudoku
+
+
+def _key(input_grid):
+
+    '''
+    Returns the hash of the canonical form of input_grid, a tuple of values as
+    given by sudoku._parse_line, which is the same for every sudoku equivalent
+    to it and, as it takes 16 bytes, never the same for any other in practice.
+    Where canon.canonicalize gives up, as for sudokus with nearly every value
+    given, the hash is of input_grid itself, so that only exact copies of it
+    are found.
+
+    '''
+
+    canonical = canon.canonicalize(input_grid)
+
+    # Sudokus hashed as they are are kept apart from canonical forms, which
+    # they may happen to equal.
+    if canonical is None:
+        grid, person = input_grid, b"exact"
+    else:
+        grid, person = canonical[0], b""
+
+    line = "".join(sudoku._CHARS[value] for value in grid)
+    return hashlib.blake2b(line.encode(), digest_size=16, person=person).digest()
+
+
+def _key_chunk(lines):
+
+    '''
+    Takes lines, a list of tuples of a line number and a line of a .sdk file,
+    and returns a list with, for every line, the hash given by _key, or if it
+    is not a sudoku, the message from sudoku._parse_line saying why.
+
+    '''
+
+    results = []
+    for i, line in lines:
+        input_grid = sudoku._parse_line(i, line)
+        results.append(input_grid if isinstance(input_grid, str) else _key(input_grid))
+    return results
+
+
+class _Index:
+    def __init__(self, memory, directory):
+
+        '''
+        Numbers every hash added, in the order they are first added. Up to
+        memory hashes are kept in a dict, after which they are all moved to a
+        sqlite database in a temporary file in directory, and the dict starts
+        again empty.
+        self.count is the number of different hashes added, and self.spills the
+        number of times they were moved.
+
+        '''
+
+        self.memory = memory
+        self.directory = directory
+        self.entries = {}
+        self.count = 0
+        self.spills = 0
+        self.db = None
+        self.path = None
+
+    def add(self, key):
+
+        '''
+        Returns the number of key, and whether it has not been added before.
+
+        '''
+
+        number = self.entries.get(key)
+
+        if number is None and self.db is not None:
+            row = self.db.execute(
+                "SELECT number FROM keys WHERE key = ?", (key,)
+            ).fetchone()
+            number = row[0] if row else None
+
+        if number is not None:
+            return number, False
+
+        number = self.count
+        self.count += 1
+        self.entries[key] = number
+
+        if len(self.entries) >= self.memory:
+            self._spill()
+
+        return number, True
+
+    def _spill(self):
+
+        # Nothing needs to survive a crash, so the database is never synced.
+        if self.db is None:
+            handle, self.path = tempfile.mkstemp(".db", "dedup-", self.directory)
+            os.close(handle)
+            self.db = sqlite3.connect(self.path)
+            self.db.execute("PRAGMA journal_mode=OFF")
+            self.db.execute("PRAGMA synchronous=OFF")
+            self.db.execute(
+                "CREATE TABLE keys (key BLOB PRIMARY KEY, number INTEGER) "
+                "WITHOUT ROWID"
+            )
+
+        with self.db:
+            self.db.executemany("INSERT INTO keys VALUES (?, ?)", self.entries.items())
+
+        self.entries.clear()
+        self.spills += 1
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            os.remove(self.path)
+            self.db = None
+
+
+def _parse_args(parser, args=None):
+
+    parser.add_argument("in_path", help="A path to a .sdk file to remove repeats from.")
+    parser.add_argument(
+        "out_path", help="A path to a new .sdk file to write the unique sudokus to."
+    )
+    parser.add_argument(
+        "--map-path",
+        help="A path to a new file to write, for every line of the input, the "
+        "line of the output holding its sudoku. Defaults to the output path with "
+        "the suffix .map.",
+    )
+    parser.add_argument(
+        "--workers",
+        help="The number of processes to find canonical forms in.",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--chunk-size",
+        help="The number of sudokus sent to a worker process at a time.",
+        type=int,
+        default=256,
+    )
+    parser.add_argument(
+        "--memory",
+        help="Keep up to this many hashes in memory before moving them to disk.",
+        type=int,
+        default=1000000,
+    )
+    return parser.parse_args(args)
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    args = _parse_args(parser)
+
+    input_path, output_path = pathlib.Path(args.in_path), pathlib.Path(args.out_path)
+    map_path = pathlib.Path(args.map_path or output_path.with_suffix(".map"))
+
+    if not input_path.exists():
+        print("Not a valid input path")
+        sys.exit(1)
+    if input_path.suffix != ".sdk" or output_path.suffix != ".sdk":
+        print("Input and output must be .sdk files.")
+        sys.exit(1)
+    if output_path.exists() or map_path.exists():
+        print("This file already exists")
+        sys.exit(1)
+
+    if args.workers < 1 or args.chunk_size < 1 or args.memory < 1:
+        print("--workers, --chunk-size and --memory must be at least 1.")
+        sys.exit(1)
+
+    # The database is made next to the output, as the default temporary
+    # directory is often in memory.
+    index = _Index(args.memory, output_path.resolve().parent)
+    read, invalid = 0, 0
+    start = time.perf_counter()
+
+    with contextlib.ExitStack() as stack:
+        stack.callback(index.close)
+        reader = stack.enter_context(input_path.open("r"))
+        writer = stack.enter_context(output_path.open("x"))
+        mapping = stack.enter_context(map_path.open("x"))
+
+        # Every chunk sent is kept until its results come back, in the same
+        # order, so that its lines can be written out.
+        sent = deque()
+        chunks = sudoku._chunked(enumerate(reader), args.chunk_size)
+        chunks = (sent.append(chunk) or chunk for chunk in chunks)
+
+        # The first of every set of equivalent sudokus is the same however many
+        # workers there are, as results come back in the order chunks were sent.
+        if args.workers > 1:
+            pool = stack.enter_context(multiprocessing.Pool(args.workers))
+            results = sudoku._imap_bounded(pool, _key_chunk, chunks, 4 * args.workers)
+        else:
+            results = map(_key_chunk, chunks)
+
+        for keys in results:
+            for (_, line), key in zip(sent.popleft(), keys):
+                read += 1
+
+                if isinstance(key, str):
+                    print(key)
+                    mapping.write("invalid\n")
+                    invalid += 1
+                    continue
+
+                number, new = index.add(key)
+                if new:
+                    writer.write(line.rstrip("\n").upper())
+                    writer.write("\n")
+
+                mapping.write(f"{number}\n")
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"read {read} sudokus in {elapsed:.2f}s, wrote {index.count} unique, "
+        f"{read - invalid - index.count} repeats, {invalid} invalid"
+    )
+    if index.spills:
+        print(f"moved hashes to disk {index.spills} times")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+'''
+Solves sudokus as an exact cover problem, using Donald Knuth's Algorithm X on
+a dancing links structure.
+
+Every way of assigning a value to a position is a row of the problem, 729 in
+all for a 9x9 sudoku, and every row covers four of the 324 constraints: its
+position has a value, its row has its value, its column has its value and its
+box has its value. A solution is a set of 81 rows covering every constraint
+exactly once. 16x16 and 25x25 sudokus are solved the same way, with more rows
+and constraints.
+
+'''
+
+from functools import lru_cache
+
+
+# Constraints are numbered from 1, as node 0 is the root of the header list.
+# For a sudoku of size values, nodes 1 to 4 * size * size head the constraints,
+# and the four nodes of the row assigning the value (n + 1) to the position
+# cell start after them, at 4 * size * size + 1 + (cell * size + n) * 4.
+@lru_cache(maxsize=None)
+def _build(size):
+
+    '''
+    Links every node of the full problem for sudokus of size values, with no
+    values assigned, and returns the lists holding the links to the node left,
+    right, up and down of every node, the constraint every node is under, and
+    the number of nodes under every constraint.
+
+    '''
+
+    cells = size * size
+    box_size = int(size ** 0.5)
+    constraint_count = 4 * cells
+    first_row_node = constraint_count + 1
+
+    nodes = first_row_node + cells * size * 4
+    left, right = [0] * nodes, [0] * nodes
+    up, down = list(range(nodes)), list(range(nodes))
+    column = list(range(nodes))
+    count = [0] * first_row_node
+
+    for node in range(first_row_node):
+        left[node] = node - 1 if node else constraint_count
+        right[node] = node + 1 if node < constraint_count else 0
+
+    for row_id in range(cells * size):
+        cell, n = divmod(row_id, size)
+        row, col = divmod(cell, size)
+        box = row // box_size * box_size + col // box_size
+        first = first_row_node + row_id * 4
+
+        constraints = (
+            1 + cell,
+            1 + cells + row * size + n,
+            1 + 2 * cells + col * size + n,
+            1 + 3 * cells + box * size + n,
+        )
+
+        for i, constraint in enumerate(constraints):
+            node = first + i
+            column[node] = constraint
+            count[constraint] += 1
+
+            up[node] = up[constraint]
+            down[node] = constraint
+            down[up[constraint]] = node
+            up[constraint] = node
+
+            left[node] = first + (i - 1) % 4
+            right[node] = first + (i + 1) % 4
+
+    return left, right, up, down, column, count
+
+
+def solve(input_grid, limit=1):
+
+    '''
+    Returns a list of up to limit solutions to input_grid, a tuple of the 81,
+    256 or 625 values read left to right, top to bottom, with 0 meaning no
+    value. Every solution is a tuple in the same form. The list is empty if
+    input_grid has no solution, including when two of its values contradict
+    each other.
+
+    '''
+
+    size = int(len(input_grid) ** 0.5)
+    first_row_node = 4 * len(input_grid) + 1
+    left, right, up, down, column, count = (list(links) for links in _build(size))
+
+    def cover(constraint):
+        left[right[constraint]] = left[constraint]
+        right[left[constraint]] = right[constraint]
+
+        i = down[constraint]
+        while i != constraint:
+            j = right[i]
+            while j != i:
+                up[down[j]] = up[j]
+                down[up[j]] = down[j]
+                count[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def uncover(constraint):
+        i = up[constraint]
+        while i != constraint:
+            j = left[i]
+            while j != i:
+                count[column[j]] += 1
+                up[down[j]] = j
+                down[up[j]] = j
+                j = left[j]
+            i = up[i]
+
+        left[right[constraint]] = constraint
+        right[left[constraint]] = constraint
+
+    values = list(input_grid)
+
+    # Assigning the starting values covers the constraints of their rows. If
+    # one of these constraints has already been covered, another starting value
+    # has satisfied it and the two contradict each other.
+    for cell, value in enumerate(input_grid):
+        if value == 0:
+            continue
+
+        first = first_row_node + (cell * size + value - 1) * 4
+        for node in range(first, first + 4):
+            if right[left[column[node]]] != column[node]:
+                return []
+            cover(column[node])
+
+    solutions = []
+
+    def search():
+
+        # Choosing the constraint satisfied by the fewest rows keeps the
+        # search tree narrow.
+        best, best_count = 0, len(count)
+        constraint = right[0]
+        while constraint != 0:
+            if count[constraint] < best_count:
+                best, best_count = constraint, count[constraint]
+                if best_count < 2:
+                    break
+            constraint = right[constraint]
+
+        if best == 0:
+            solutions.append(tuple(values))
+            return len(solutions) >= limit
+
+        if best_count == 0:
+            return False
+
+        cover(best)
+
+        i = down[best]
+        while i != best:
+            j = right[i]
+            while j != i:
+                cover(column[j])
+                j = right[j]
+
+            cell, n = divmod((i - first_row_node) // 4, size)
+            values[cell] = n + 1
+
+            if search():
+                return True
+
+            values[cell] = 0
+
+            j = left[i]
+            while j != i:
+                uncover(column[j])
+                j = left[j]
+
+            i = down[i]
+
+        uncover(best)
+        return False
+
+    search()
+    return solutions
@@ -0,0 +1,276 @@
+'''
+Generates sudokus with exactly one solution, graded by the checks sudoku.py
+needs to solve them.
+
+Run with:
+
+    python generate.py <path/to/output.sdk> [--count N] [--tier TIER]
+
+A full grid is made by solving an empty sudoku with only its first row filled
+in at random, then relabelling, reordering and possibly transposing it at
+random. Values are then removed from it one at a time, in a random order. For
+the initial_checks and advanced_checks tiers a value stays removed only if the
+checks of that tier alone still solve the sudoku, which also means it still has
+one solution. For the brute_force tier a value stays removed only if the value
+is the only one that position can take, which Grid.brute_force checks by
+looking for a single solution with that value ruled out. The finished sudoku is
+graded, and if its tier is not the one asked for, another is made.
+
+'''
+
+from functools import partial
+import argparse, contextlib, multiprocessing, pathlib, random, sys, time
+
+import canon, sudoku
+
+TIERS = ("initial_checks", "advanced_checks", "brute_force")
+
+
+def shuffle(grid, rng):
+
+    '''
+    Returns grid, a tuple of 81, 256 or 625 values read left to right, top to
+    bottom, with its values relabelled, its rows swapped within their bands, its
+    bands swapped, likewise for its columns and stacks, and possibly
+    transposed, all at random. The result is an equivalent sudoku with the same
+    number of solutions.
+
+    '''
+
+    size = int(len(grid) ** 0.5)
+    box = int(size ** 0.5)
+
+    def order():
+        bands = rng.sample(range(box), box)
+        return [band * box + i for band in bands for i in rng.sample(range(box), box)]
+
+    rows, cols = order(), order()
+    labels = [0] + rng.sample(range(1, size + 1), size)
+    grid = canon.Transform(False, rows, cols, labels).apply(grid)
+
+    return canon._transposed(grid) if rng.random() < 0.5 else grid
+
+
+def full_grid(rng, size=9):
+
+    '''
+    Returns a random solved sudoku of size values, as a tuple read left to
+    right, top to bottom.
+
+    '''
+
+    first_row = rng.sample(range(1, size + 1), size)
+    grid = sudoku.Grid(tuple(first_row) + (0,) * (size * size - size))
+    grid.brute_force()
+
+    return shuffle(tuple(grid.solution), rng)
+
+
+def grade(puzzle):
+
+    '''
+    Returns the tier of puzzle: the name of the last of initial_checks,
+    advanced_checks and brute_force needed to solve it, as in sudoku._LEVELS.
+
+    '''
+
+    grid = sudoku.Grid(puzzle)
+    initial, advanced = grid.propagate()
+
+    if not grid.board_full():
+        return "brute_force"
+
+    return "advanced_checks" if advanced else "initial_checks"
+
+
+def remove_clues(solution, rng, tier="brute_force", clues=0):
+
+    '''
+    Empties the positions of solution in a random order, skipping any which
+    would leave it with more than one solution or, unless tier is brute_force,
+    needing checks beyond tier to solve, until it has only clues values left or
+    no more can be removed. Returns the puzzle left.
+    One Grid is kept for the whole puzzle, and a value is taken out of its Board
+    and put back if it has to stay, rather than a Grid being made for every
+    position tried.
+
+    '''
+
+    grid = sudoku.Grid(tuple(solution))
+    board, layout = grid.board, grid.layout
+    limit = TIERS.index(tier)
+
+    for cell in rng.sample(range(layout.cells), layout.cells):
+        if layout.cells - board.empty <= clues:
+            break
+
+        value = board.values[cell]
+        bit = 1 << (value - 1)
+        board.unplace(cell)
+
+        # A value which is the only one its position can take next to the
+        # values left is found again by one_possibility straight away, so
+        # removing it can neither add a solution nor make the sudoku harder.
+        if (board.revealed(cell) | bit) == layout.all:
+            keep = True
+
+        # Any other solution would have another value at this position, so it
+        # is enough to look for a single solution with value ruled out.
+        elif tier == "brute_force":
+            board.cands[cell] = layout.all & ~bit
+            keep = grid.brute_force() == 0
+
+        else:
+            keep = TIERS.index(grade(tuple(board.values))) <= limit
+
+        if keep:
+            board.cands[cell] = layout.all
+        else:
+            board.cands[cell] = bit
+            board.place(cell, value)
+
+    return tuple(board.values)
+
+
+def generate(rng, tier=None, size=9, clues=0, attempts=100):
+
+    '''
+    Returns a random sudoku of size values with one solution, along with its
+    tier. If tier is given, sudokus are made until one of that tier is, up to
+    attempts times, after which the last is returned whatever its tier.
+
+    '''
+
+    for _ in range(attempts):
+        puzzle = remove_clues(full_grid(rng, size), rng, tier or "brute_force", clues)
+        found = grade(puzzle)
+
+        if tier is None or found == tier:
+            break
+
+    return puzzle, found
+
+
+def _generate_chunk(indices, seed, tier, size, clues):
+
+    '''
+    Generates the sudokus numbered indices, each from its own random number
+    generator seeded by seed and its number, so that the same sudokus are made
+    however they are split between processes. Returns each as a line of a .sdk
+    file along with its tier.
+
+    '''
+
+    results = []
+    for index in indices:
+        puzzle, found = generate(random.Random(f"{seed}-{index}"), tier, size, clues)
+        results.append(("".join(sudoku._CHARS[value] for value in puzzle), found))
+    return results
+
+
+def _parse_args(parser, args=None):
+
+    parser.add_argument(
+        "out_path",
+        help="A path to a new .sdk file to write the sudokus to.",
+        nargs="?",
+    )
+    parser.add_argument(
+        "--count", help="The number of sudokus to make.", type=int, default=100
+    )
+    parser.add_argument(
+        "--tier",
+        help="Only make sudokus needing these checks to solve. Defaults to any.",
+        choices=TIERS,
+    )
+    parser.add_argument(
+        "--size",
+        help="The number of values in every row, column and box.",
+        type=int,
+        choices=sorted(sudoku._SIZES.values()),
+        default=9,
+    )
+    parser.add_argument(
+        "--clues",
+        help="Stop removing values once only this many are left.",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "--seed",
+        help="Seeds the sudokus made. The same seed always makes the same sudokus.",
+        default=None,
+    )
+    parser.add_argument(
+        "--workers",
+        help="The number of processes to make the sudokus in.",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--chunk-size",
+        help="The number of sudokus a worker process makes at a time.",
+        type=int,
+        default=16,
+    )
+    return parser.parse_args(args)
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    args = _parse_args(parser)
+
+    if not args.out_path:
+        print("Please enter a path for the generated sudokus.")
+        sys.exit(1)
+
+    output_path = pathlib.Path(args.out_path)
+    if output_path.exists():
+        print("This file already exists")
+        sys.exit(1)
+    if not output_path.suffix == ".sdk":
+        print("Output is not a .sdk file.")
+        sys.exit(1)
+
+    if args.workers < 1 or args.chunk_size < 1:
+        print("--workers and --chunk-size must be at least 1.")
+        sys.exit(1)
+
+    seed = args.seed if args.seed is not None else random.randrange(2**32)
+    chunks = sudoku._chunked(range(args.count), args.chunk_size)
+    generate_chunk = partial(
+        _generate_chunk, seed=seed, tier=args.tier, size=args.size, clues=args.clues
+    )
+
+    tiers = dict.fromkeys(TIERS, 0)
+    start = time.perf_counter()
+
+    with contextlib.ExitStack() as stack:
+        writer = stack.enter_context(output_path.open("w"))
+
+        if args.workers > 1:
+            pool = stack.enter_context(multiprocessing.Pool(args.workers))
+            results = sudoku._imap_bounded(
+                pool, generate_chunk, chunks, 4 * args.workers
+            )
+        else:
+            results = map(generate_chunk, chunks)
+
+        for chunk_results in results:
+            for line, found in chunk_results:
+                writer.write(line)
+                writer.write("\n")
+                tiers[found] += 1
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"made {args.count} sudokus in {elapsed:.2f}s "
+        f"({args.count / elapsed:.1f} per second) with seed {seed}"
+    )
+    for tier, count in tiers.items():
+        print(f"{tier:<16}{count:>8}")
+
+
+if __name__ == "__main__":
+    main()
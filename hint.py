@@ -0,0 +1,209 @@
+'''
+Finds the next logical step of a sudoku being solved by hand, for interactive
+front ends which ask for a hint after every move. For example:
+
+    session = hint.Session(sudoku._parse_line(0, line))
+    session.place(cell, value)
+    technique, cells, value = session.hint()
+
+A Session keeps one Grid for the whole sudoku, and every move is applied to its
+Board as a change, rather than a Grid being made and checked from the beginning
+for every hint. The possibilities of every position are kept up to date with
+the values placed, along with every possibility removed by the hints given so
+far, so each hint carries on from the last.
+
+'''
+
+import sudoku
+
+# The methods of Grid which give a value to a position, rather than removing
+# possibilities.
+PLACEMENTS = ("one_possibility", "only_instance")
+
+
+class Session:
+    def __init__(self, input_grid, techniques=sudoku.Grid.TECHNIQUES):
+
+        '''
+        Starts solving input_grid, a tuple of values as given by
+        sudoku._parse_line, by hand. techniques names the expert techniques
+        self.hint may use, in order, as for sudoku.Grid. Raises ValueError if
+        input_grid has the same value twice in a row, column or box.
+        self.grid is the Grid of the sudoku as it stands, and self.givens the
+        positions with a value in input_grid, which cannot be erased.
+
+        '''
+
+        self.grid = grid = sudoku.Grid(input_grid, techniques=techniques)
+        board = grid.board
+
+        if board.duplicated:
+            raise ValueError("The sudoku has the same value twice in a subgrid.")
+
+        self.givens = frozenset(
+            cell for cell, value in enumerate(input_grid) if value != 0
+        )
+
+        # The position of every value placed, along with the snapshot of the
+        # Board from before it was placed, so that erasing the last value
+        # placed gives back the possibilities removed before it.
+        self.history = []
+
+        # The version of the Board when self.hint last found nothing, so that
+        # asking again before anything changes costs nothing.
+        self.stalled = None
+
+        for cell in range(grid.layout.cells):
+            if board.values[cell] == 0:
+                grid.adjacent_elimination(cell)
+
+    def place(self, cell, value):
+
+        '''
+        Places value at the position cell, which must have no value, and removes
+        it from the possibilities of every position sharing a subgrid with it.
+        Raises ValueError if value is already revealed in one of those subgrids.
+        value need not be the one the solution has there, but hints given after
+        a wrong value is placed may be about a sudoku with no solution.
+
+        '''
+
+        grid = self.grid
+        board, layout = grid.board, grid.layout
+
+        if board.values[cell] != 0:
+            raise ValueError(f"Position {cell} already has a value.")
+        if not 1 <= value <= layout.size:
+            raise ValueError(f"{value} is not a value of this sudoku.")
+
+        bit = 1 << (value - 1)
+        if board.revealed(cell) & bit:
+            raise ValueError(f"{value} is already revealed next to position {cell}.")
+
+        self.history.append((cell, board.snapshot()))
+        board.set_cands(cell, bit)
+        board.place(cell, value)
+        grid._remove(bit, layout.peer_masks[cell])
+
+    def erase(self, cell):
+
+        '''
+        Removes the value placed at the position cell. If it was the last value
+        placed, the possibilities come back as they were before it was placed,
+        and every step found by self.hint since is dropped. Otherwise, what was
+        found may have relied on it, so every position with no value gets back
+        every possibility not revealed in its subgrids. Raises ValueError if
+        cell has no value or holds a value of the input grid.
+
+        '''
+
+        grid = self.grid
+        board, layout = grid.board, grid.layout
+
+        if cell in self.givens:
+            raise ValueError(f"Position {cell} holds a value of the sudoku.")
+        if board.values[cell] == 0:
+            raise ValueError(f"Position {cell} has no value.")
+
+        if self.history and self.history[-1][0] == cell:
+            board.restore(self.history.pop()[1])
+            return
+
+        # Every snapshot taken since includes the value erased.
+        self.history.clear()
+        board.unplace(cell)
+
+        for other in range(layout.cells):
+            if board.values[other] == 0:
+                mask = layout.all & ~board.revealed(other)
+                if mask != board.cands[other]:
+                    board.set_cands(other, mask)
+
+    def _steps(self):
+
+        '''
+        Yields the name of every check of self.grid which might find the next
+        step, along with the method and its arguments, in the order the checks
+        are made when solving, the cheapest first.
+
+        '''
+
+        grid = self.grid
+        values, subgrids = grid.board.values, grid.layout.subgrids
+        size = grid.layout.size
+
+        for cell in range(grid.layout.cells):
+            if values[cell] == 0:
+                yield "one_possibility", grid.one_possibility, (cell,)
+
+        for subgrid in subgrids:
+            yield "only_instance", grid.only_instance, (subgrid,)
+
+        for name in ("identical_possibilities", "unique_possibilities"):
+            for i in range(2, 5):
+                for subgrid in subgrids:
+                    yield name, getattr(grid, name), (subgrid, i)
+
+        method = grid.box_line_intersection
+        for i, subgrid in enumerate(subgrids):
+            yield "box_line_intersection", method, (subgrid, i < 2 * size)
+
+        for name in grid.techniques:
+            yield name, getattr(grid, name), ()
+
+    def hint(self):
+
+        '''
+        Returns the cheapest next step as a tuple of the name of the check of
+        sudoku.Grid which finds it, a tuple of positions and a value, or None if
+        no check can find one, as when the sudoku is solved or needs brute
+        force. For the checks in PLACEMENTS, the step is to place the value at
+        the one position given, which is left to self.place. For every other
+        check, the step is to remove the value from the possibilities of the
+        positions given, which is done here, so that the next hint carries on
+        from it. A check removing several values is given as several steps,
+        the lowest value first.
+        Single values are found in well under a millisecond, but finding that
+        no check can make progress means trying every one, which takes tens of
+        milliseconds. That is only done once until the next move.
+
+        '''
+
+        board = self.grid.board
+        cells = self.grid.layout.cells
+        version = board.version
+
+        if board.empty == 0 or self.stalled == version:
+            return None
+
+        snapshot = board.snapshot()
+
+        for name, method, args in self._steps():
+            method(*args)
+
+            if board.version == version:
+                continue
+
+            values, cands = snapshot[:cells], snapshot[cells : 2 * cells]
+
+            if name in PLACEMENTS:
+                cell = next(c for c in range(cells) if board.values[c] != values[c])
+                value = board.values[cell]
+                board.restore(snapshot)
+                return name, (cell,), value
+
+            removed = [cands[cell] & ~board.cands[cell] for cell in range(cells)]
+            lowest = 0
+            for mask in removed:
+                lowest |= mask
+            bit = lowest & -lowest
+
+            board.restore(snapshot)
+            found = tuple(cell for cell in range(cells) if removed[cell] & bit)
+            for cell in found:
+                board.set_cands(cell, board.cands[cell] & ~bit)
+
+            return name, found, bit.bit_length()
+
+        self.stalled = version
+        return None
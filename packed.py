@@ -0,0 +1,260 @@
+'''
+Reads and writes .sdb files, a packed binary form of .sdk files which needs no
+parsing, and which can be memory-mapped so that any number of processes read
+the same sudokus without each holding a copy.
+
+Run with:
+
+    python packed.py <path/to/input.sdk> <path/to/output.sdb>
+    python packed.py <path/to/input.sdb> <path/to/output.sdk>
+
+A .sdb file starts with a 16 byte header: the magic bytes SDKB, the version of
+the format, the number of values in every row, column and box, the number of
+bits every position takes, a byte of padding, and the number of sudokus, as a
+little-endian 64-bit integer. Every sudoku then takes the same number of bytes,
+its values read left to right, top to bottom, 0 meaning no value. Values of
+9x9 sudokus take 4 bits each, the first of every pair in the high bits, so a
+sudoku takes 41 bytes rather than the 82 of a line of a .sdk file. Values of
+16x16 and 25x25 sudokus do not fit in 4 bits, and take a byte each.
+
+'''
+
+from functools import lru_cache
+from itertools import chain
+import argparse, mmap, pathlib, struct, sys
+
+import sudoku
+
+MAGIC = b"SDKB"
+VERSION = 1
+_HEADER = struct.Struct("<4sBBBxQ")
+
+# The two values held in every byte of a 9x9 sudoku, by the byte.
+_NIBBLES = tuple((byte >> 4, byte & 15) for byte in range(256))
+
+
+def _cell_bits(size):
+    return 4 if size < 16 else 8
+
+
+def _record_size(size, cell_bits):
+    return (size * size * cell_bits + 7) // 8
+
+
+def pack(input_grid):
+
+    '''
+    Returns input_grid, a tuple of values as given by sudoku._parse_line, as the
+    bytes of a record of a .sdb file.
+
+    '''
+
+    if _cell_bits(sudoku._SIZES[len(input_grid)]) == 8:
+        return bytes(input_grid)
+
+    padded = input_grid + (0,) * (len(input_grid) % 2)
+    return bytes(high << 4 | low for high, low in zip(padded[::2], padded[1::2]))
+
+
+def unpack(record, cells):
+
+    '''
+    Returns record, the bytes of a record of a .sdb file holding cells
+    positions, as a tuple of values.
+
+    '''
+
+    if len(record) == cells:
+        return tuple(record)
+
+    return tuple(chain.from_iterable(map(_NIBBLES.__getitem__, record)))[:cells]
+
+
+class PackedWriter:
+    def __init__(self, path):
+
+        '''
+        Writes sudokus to a new .sdb file at path. The number of sudokus in the
+        header is only filled in by self.close, so the file is not complete
+        until then.
+
+        '''
+
+        self.file = open(path, "xb")
+        self.size = None
+        self.count = 0
+
+    def write(self, input_grid):
+
+        '''
+        Appends input_grid, a tuple of values as given by sudoku._parse_line.
+        Every sudoku of a file must be the same size.
+
+        '''
+
+        size = sudoku._SIZES[len(input_grid)]
+
+        if self.size is None:
+            self.size = size
+            self.file.write(_HEADER.pack(MAGIC, VERSION, size, _cell_bits(size), 0))
+        elif size != self.size:
+            raise ValueError(
+                f"a .sdb file holds sudokus of one size, not {self.size} and {size}"
+            )
+
+        self.file.write(pack(input_grid))
+        self.count += 1
+
+    def close(self):
+
+        # A file with no sudokus is given the header of an empty 9x9 file.
+        if self.size is None:
+            self.file.write(_HEADER.pack(MAGIC, VERSION, 9, _cell_bits(9), 0))
+        else:
+            self.file.seek(0)
+            cell_bits = _cell_bits(self.size)
+            self.file.write(
+                _HEADER.pack(MAGIC, VERSION, self.size, cell_bits, self.count)
+            )
+
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class PackedReader:
+    def __init__(self, path):
+
+        '''
+        Memory-maps the .sdb file at path, so that only the pages of the
+        sudokus read are loaded, and processes reading the same file share them.
+        len(self) is the number of sudokus, self[i] is sudoku i as a tuple of
+        values and self.record(i) is its record, as a view of the file rather
+        than a copy, which must be released before self.close. Raises
+        ValueError if the file is not a .sdb file, or is shorter than its header
+        says.
+
+        '''
+
+        self.file = open(path, "rb")
+
+        try:
+            header = self.file.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise ValueError(f"{path} is not a .sdb file")
+
+            magic, version, size, cell_bits, count = _HEADER.unpack(header)
+            if magic != MAGIC or size not in sudoku._SIZES.values():
+                raise ValueError(f"{path} is not a .sdb file")
+            if version != VERSION or cell_bits != _cell_bits(size):
+                raise ValueError(f"{path} is version {version}, not {VERSION}")
+
+            self.size = size
+            self.cells = size * size
+            self.record_size = _record_size(size, cell_bits)
+            self.count = count
+
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            if len(self.map) < _HEADER.size + count * self.record_size:
+                self.map.close()
+                raise ValueError(f"{path} is shorter than its header says")
+
+        except Exception:
+            self.file.close()
+            raise
+
+        self.view = memoryview(self.map)
+
+    def __len__(self):
+        return self.count
+
+    def record(self, i):
+        if not 0 <= i < self.count:
+            raise IndexError(f"sudoku {i} is not in the file")
+
+        start = _HEADER.size + i * self.record_size
+        return self.view[start : start + self.record_size]
+
+    def __getitem__(self, i):
+        return unpack(self.record(i), self.cells)
+
+    def __iter__(self):
+        return (self[i] for i in range(self.count))
+
+    def close(self):
+        self.view.release()
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+@lru_cache(maxsize=None)
+def open_shared(path):
+
+    '''
+    Returns the PackedReader of this process for path, opening it the first time
+    it is asked for, so that worker processes each map a file only once.
+
+    '''
+
+    return PackedReader(path)
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("in_path", help="A path to a .sdk or .sdb file to convert.")
+    parser.add_argument("out_path", help="A path to a new .sdb or .sdk file to write.")
+    args = parser.parse_args()
+
+    input_path, output_path = pathlib.Path(args.in_path), pathlib.Path(args.out_path)
+    suffixes = (input_path.suffix, output_path.suffix)
+
+    if not input_path.exists():
+        print("Not a valid input path")
+        sys.exit(1)
+    if output_path.exists():
+        print("This file already exists")
+        sys.exit(1)
+    if suffixes not in ((".sdk", ".sdb"), (".sdb", ".sdk")):
+        print("Convert either a .sdk file to a .sdb file, or the other way round.")
+        sys.exit(1)
+
+    if suffixes == (".sdb", ".sdk"):
+        with PackedReader(input_path) as reader, output_path.open("w") as writer:
+            for input_grid in reader:
+                writer.write("".join(sudoku._CHARS[value] for value in input_grid))
+                writer.write("\n")
+        print(f"wrote {len(reader)} sudokus")
+        return
+
+    # Lines which are not sudokus cannot be packed, so are reported and left
+    # out, as with --skip-invalid.
+    skipped = 0
+    with input_path.open("r") as reader, PackedWriter(output_path) as writer:
+        for i, line in enumerate(reader):
+            input_grid = sudoku._parse_line(i, line)
+            if not isinstance(input_grid, str):
+                try:
+                    writer.write(input_grid)
+                    continue
+                except ValueError:
+                    input_grid = f"Sudoku {i} is not the same size as sudoku 0."
+
+            print(input_grid)
+            skipped += 1
+
+    print(f"wrote {writer.count} sudokus, skipped {skipped}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,577 @@
+'''
+Keeps sudoku.py running as a service, so that solving a sudoku costs no
+interpreter start up, argument parsing or building of tables.
+
+Run with:
+
+    python server.py [--port 8081] [--unix path/to/socket] [--workers N]
+
+Over HTTP, POST /solve takes either JSON, {"sudoku": "..."} for one sudoku or
+{"sudokus": ["...", ...]} for several, or plain text with one sudoku per line,
+as in a .sdk file. The reply is JSON: a result for {"sudoku": ...}, otherwise
+{"results": [...]} with a result for every sudoku, in order. Every result has
+either "solution", the solved sudoku as a line of a .sdk file, "levels",
+"techniques", the hits of any --techniques, and "explanation", as printed by
+sudoku.py, or "error" if the sudoku is not valid, has no solution or could not
+be solved because a worker failed, in which case the status is 500.
+GET /metrics gives the metrics described in Metrics.
+
+Over a Unix socket, every line sent is one sudoku, either as a line of a .sdk
+file or as {"sudoku": "..."}, and a line of JSON with its result is sent back
+for every line, in order. A line saying metrics is answered with the metrics.
+
+Sudokus from every connection go into one queue, and are sent to the worker
+processes in chunks of up to --batch-size, waiting up to --batch-wait seconds
+for a chunk to fill, so that a busy server solves many sudokus per message to a
+worker, while a quiet one still answers straight away.
+
+'''
+
+from collections import deque
+from concurrent.futures import Future
+from functools import partial
+import argparse, json, multiprocessing, os, queue, socketserver, stat, sys, threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import sudoku
+
+
+class Metrics:
+
+    # The number of most recent sudokus the latencies are taken from.
+    WINDOW = 4096
+
+    def __init__(self):
+
+        '''
+        Counts the requests and sudokus the server has been sent, and keeps the
+        time taken to answer the most recent sudokus, from being queued to their
+        reply being built. As handlers run in threads, every change is made
+        under a lock.
+
+        '''
+
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.solved = 0
+        self.no_solution = 0
+        self.invalid = 0
+        self.batches = 0
+        self.batched = 0
+        self.latencies = deque(maxlen=self.WINDOW)
+
+    def request(self, invalid=0):
+        with self.lock:
+            self.requests += 1
+            self.invalid += invalid
+
+    def batch(self, size):
+        with self.lock:
+            self.batches += 1
+            self.batched += size
+
+    def result(self, solved, latency):
+        with self.lock:
+            if solved:
+                self.solved += 1
+            else:
+                self.no_solution += 1
+            self.latencies.append(latency)
+
+    def as_dict(self):
+
+        '''
+        Returns the metrics as a dict: the counts so far, the sudokus solved per
+        second since the server started, the mean number of sudokus sent to a
+        worker at a time, and the mean, median, 99th percentile and greatest
+        latency of the most recent sudokus, in milliseconds.
+
+        '''
+
+        with self.lock:
+            uptime = time.perf_counter() - self.started
+            latencies = sorted(self.latencies)
+            answered = self.solved + self.no_solution
+
+            metrics = {
+                "uptime_s": uptime,
+                "requests": self.requests,
+                "solved": self.solved,
+                "no_solution": self.no_solution,
+                "invalid": self.invalid,
+                "batches": self.batches,
+                "mean_batch_size": self.batched / self.batches if self.batches else 0,
+                "sudokus_per_sec": answered / uptime,
+            }
+
+        if latencies:
+            metrics["latency_ms"] = {
+                "mean": 1000 * sum(latencies) / len(latencies),
+                "p50": 1000 * _percentile(latencies, 50),
+                "p99": 1000 * _percentile(latencies, 99),
+                "max": 1000 * latencies[-1],
+            }
+
+        return metrics
+
+
+def _percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+class Batcher:
+    def __init__(self, solve_chunk, workers, batch_size, batch_wait, metrics):
+
+        '''
+        Solves the sudokus given to self.submit in chunks, with solve_chunk,
+        which takes and returns chunks as sudoku._solve_chunk does. With more
+        than one worker, chunks are solved in a multiprocessing.Pool, with at
+        most two chunks per worker at a time, so that sudokus wait in the queue
+        rather than in the pool when it is busy. Otherwise they are solved in
+        the thread collecting them.
+
+        '''
+
+        self.solve_chunk = solve_chunk
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.metrics = metrics
+        self.queue = queue.Queue()
+        self.pool = multiprocessing.Pool(workers) if workers > 1 else None
+        self.slots = threading.BoundedSemaphore(2 * workers)
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, input_grid):
+
+        '''
+        Queues input_grid, a tuple of values as given by sudoku._parse_line, to
+        be solved. Returns a concurrent.futures.Future, whose result is None if
+        input_grid has no solution, otherwise a tuple of the levels of checking
+        required, the solution as a line of a .sdk file and the hits of the
+        expert techniques.
+
+        '''
+
+        future = Future()
+        self.queue.put((input_grid, future))
+        return future
+
+    def _take(self):
+
+        '''
+        Waits for a sudoku to be queued, then takes it along with any more
+        queued within self.batch_wait seconds, up to self.batch_size.
+
+        '''
+
+        chunk = [self.queue.get()]
+        deadline = time.perf_counter() + self.batch_wait
+
+        while len(chunk) < self.batch_size:
+            try:
+                chunk.append(self.queue.get_nowait())
+            except queue.Empty:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    chunk.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+        return chunk
+
+    def _run(self):
+        while True:
+            chunk = self._take()
+            self.metrics.batch(len(chunk))
+            input_grids = [input_grid for input_grid, _ in chunk]
+
+            self.slots.acquire()
+            if self.pool is None:
+                try:
+                    solved = self.solve_chunk(input_grids)
+                except Exception as error:
+                    self._fail(chunk, error)
+                else:
+                    self._finish(chunk, solved)
+            else:
+                self.pool.apply_async(
+                    self.solve_chunk,
+                    (input_grids,),
+                    callback=partial(self._finish, chunk),
+                    error_callback=partial(self._fail, chunk),
+                )
+
+    def _finish(self, chunk, solved):
+        self.slots.release()
+        results = solved[0]
+
+        for (_, future), result in zip(chunk, results):
+            if result is not None:
+                levels, _, solved_string, hits, _ = result
+                result = levels, solved_string, hits
+            future.set_result(result)
+
+    def _fail(self, chunk, error):
+        self.slots.release()
+        for _, future in chunk:
+            future.set_exception(error)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+
+
+def _solve_lines(batcher, metrics, lines):
+
+    '''
+    Solves lines, strings of sudokus, returning a dict of the result for each,
+    in order, as described at the top of this module, along with whether any
+    could not be solved because a worker failed. Every sudoku is queued before
+    waiting for any, so that they can be solved in the same chunks.
+
+    '''
+
+    input_grids = [sudoku._parse_line(i, line.strip()) for i, line in enumerate(lines)]
+    invalid = sum(isinstance(input_grid, str) for input_grid in input_grids)
+    metrics.request(invalid)
+
+    queued = time.perf_counter()
+    futures = [
+        input_grid if isinstance(input_grid, str) else batcher.submit(input_grid)
+        for input_grid in input_grids
+    ]
+
+    results = [
+        _result(i, future, metrics, queued) for i, future in enumerate(futures)
+    ]
+    failed = any(
+        not isinstance(future, str) and future.exception() is not None
+        for future in futures
+    )
+    return results, failed
+
+
+def _result(i, future, metrics, queued):
+
+    '''
+    Waits for future, as given by Batcher.submit for sudoku i at the time
+    queued, and returns the dict of its result, counting it in metrics once
+    the dict is built. future may instead be the message from
+    sudoku._parse_line saying why the sudoku is not valid. If solving it raised
+    an exception, the dict holds that as its error.
+
+    '''
+
+    if isinstance(future, str):
+        return {"error": future}
+
+    try:
+        solved = future.result()
+    except Exception as error:
+        return {"error": f"Sudoku {i} could not be solved: {error!r}"}
+
+    if solved is None:
+        result = {"error": f"Sudoku {i} has no solution."}
+    else:
+        levels, solved_string, hits = solved
+        result = {
+            "solution": solved_string,
+            "levels": None if levels is None else dict(zip(sudoku._LEVELS, levels)),
+            "techniques": hits,
+            "explanation": sudoku._explain(levels, hits),
+        }
+
+    metrics.result(solved is not None, time.perf_counter() - queued)
+    return result
+
+
+class _HTTPHandler(BaseHTTPRequestHandler):
+
+    # The Batcher and Metrics are set on a subclass made for every server.
+    batcher = None
+    metrics = None
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._reply(200, self.metrics.as_dict())
+        else:
+            self._reply(404, {"error": "Not found."})
+
+    def do_POST(self):
+        if self.path != "/solve":
+            self._reply(404, {"error": "Not found."})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+
+        if length < 0:
+            self._reply(400, {"error": "Content-Length must be a number of bytes."})
+            return
+
+        body = self.rfile.read(length).decode(errors="replace")
+
+        if not body.lstrip().startswith("{"):
+            lines = [line for line in body.splitlines() if line.strip()]
+            results, failed = _solve_lines(self.batcher, self.metrics, lines)
+            self._reply(500 if failed else 200, {"results": results})
+            return
+
+        try:
+            request = json.loads(body)
+        except ValueError:
+            self._reply(400, {"error": "Not valid JSON."})
+            return
+
+        if isinstance(request.get("sudoku"), str):
+            lines = [request["sudoku"]]
+            results, failed = _solve_lines(self.batcher, self.metrics, lines)
+            self._reply(500 if failed else 200, results[0])
+
+        elif isinstance(request.get("sudokus"), list) and all(
+            isinstance(line, str) for line in request["sudokus"]
+        ):
+            lines = request["sudokus"]
+            results, failed = _solve_lines(self.batcher, self.metrics, lines)
+            self._reply(500 if failed else 200, {"results": results})
+
+        else:
+            self._reply(400, {"error": 'Expected "sudoku" or "sudokus".'})
+
+    # Every request is counted in the metrics rather than logged.
+    def log_message(self, format, *args):
+        pass
+
+
+class _UnixHandler(socketserver.StreamRequestHandler):
+
+    # The Batcher and Metrics are set on a subclass made for every server.
+    batcher = None
+    metrics = None
+
+    def handle(self):
+
+        '''
+        Reads sudokus a line at a time, queueing each as soon as it is read,
+        while a second thread writes the results back in order. A client can
+        send many lines before reading any results, or wait for each.
+
+        '''
+
+        replies = queue.Queue()
+        writer = threading.Thread(target=self._write, args=(replies,))
+        writer.start()
+        i = 0
+
+        try:
+            for line in self.rfile:
+                line = line.decode(errors="replace").strip()
+                if not line:
+                    continue
+
+                if line == "metrics":
+                    replies.put(self.metrics.as_dict())
+                    continue
+
+                if line.startswith("{"):
+                    try:
+                        line = json.loads(line)["sudoku"]
+                    except (ValueError, KeyError, TypeError):
+                        line = None
+
+                    if not isinstance(line, str):
+                        replies.put({"error": 'Expected {"sudoku": "..."}.'})
+                        continue
+
+                # Sudokus are numbered by their line on this connection.
+                input_grid = sudoku._parse_line(i, line)
+                self.metrics.request(isinstance(input_grid, str))
+
+                queued = time.perf_counter()
+                if not isinstance(input_grid, str):
+                    input_grid = self.batcher.submit(input_grid)
+
+                replies.put((i, input_grid, queued))
+                i += 1
+        finally:
+            replies.put(None)
+            writer.join()
+
+    def _write(self, replies):
+        while True:
+            reply = replies.get()
+            if reply is None:
+                return
+
+            if isinstance(reply, tuple):
+                i, future, queued = reply
+                reply = _result(i, future, self.metrics, queued)
+
+            try:
+                self.wfile.write(json.dumps(reply).encode() + b"\n")
+                self.wfile.flush()
+            except OSError:
+                # The client has gone, but the rest of its sudokus are still
+                # waited for, so that none is left solving unread.
+                pass
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _parse_args(parser, args=None):
+
+    parser.add_argument(
+        "--host",
+        help="The address to serve HTTP on. Defaults to this machine only.",
+        default="127.0.0.1",
+    )
+    parser.add_argument(
+        "--port",
+        help="The port to serve HTTP on. Defaults to 8081 unless --unix is given.",
+        type=int,
+    )
+    parser.add_argument("--unix", help="A path to serve a Unix socket on.")
+    parser.add_argument(
+        "--workers",
+        help="The number of processes to solve the sudokus in.",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--batch-size",
+        help="The most sudokus to send to a worker at a time.",
+        type=int,
+        default=64,
+    )
+    parser.add_argument(
+        "--batch-wait",
+        help="The longest time in seconds to wait for more sudokus to send.",
+        type=float,
+        default=0.002,
+    )
+    parser.add_argument(
+        "--engine",
+        help="The engine to solve the sudokus with, as for sudoku.py.",
+        choices=("grid", "dlx", "batch"),
+        default="grid",
+    )
+    parser.add_argument(
+        "--incremental",
+        help="Propagate possibilities incrementally, as for sudoku.py.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--techniques",
+        help="Expert techniques to try before brute_force, as for sudoku.py.",
+        default="",
+    )
+    parser.add_argument(
+        "--cache",
+        help="Remember the solutions of up to this many sudokus, as for sudoku.py.",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "--cache-file",
+        help="A path to a sqlite database of solutions, as for sudoku.py.",
+    )
+    return parser.parse_args(args)
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    args = _parse_args(parser)
+
+    if args.workers < 1 or args.batch_size < 1 or args.batch_wait < 0:
+        print("--workers and --batch-size must be at least 1, --batch-wait at least 0.")
+        sys.exit(1)
+
+    # Only a socket left by an earlier server is replaced, never any other file.
+    if args.unix and os.path.lexists(args.unix):
+        if not stat.S_ISSOCK(os.lstat(args.unix).st_mode):
+            print(f"{args.unix} exists and is not a socket.")
+            sys.exit(1)
+        os.unlink(args.unix)
+
+    if args.engine == "batch":
+        try:
+            import batch
+        except ImportError:
+            print("--engine batch needs numpy to be installed.")
+            sys.exit(1)
+
+    cache_options = None
+    if args.cache > 0 or args.cache_file:
+        cache_options = (args.cache or 4096, args.cache_file)
+
+    try:
+        techniques = sudoku._parse_techniques(args.techniques)
+    except ValueError as error:
+        print(error)
+        sys.exit(1)
+
+    solve_chunk = partial(
+        sudoku._solve_chunk,
+        incremental=args.incremental,
+        engine=args.engine,
+        cache_options=cache_options,
+        techniques=techniques,
+        pretty=False,
+    )
+    metrics = Metrics()
+    batcher = Batcher(
+        solve_chunk, args.workers, args.batch_size, args.batch_wait, metrics
+    )
+    handler_options = {"batcher": batcher, "metrics": metrics}
+
+    servers = []
+    if args.unix:
+        handler = type("UnixHandler", (_UnixHandler,), handler_options)
+        servers.append(_UnixServer(args.unix, handler))
+        print(f"serving on unix socket {args.unix}")
+
+    if args.port is not None or not args.unix:
+        port = 8081 if args.port is None else args.port
+        handler = type("HTTPHandler", (_HTTPHandler,), handler_options)
+        servers.append(ThreadingHTTPServer((args.host, port), handler))
+        print(f"serving on http://{args.host}:{servers[-1].server_port}")
+
+    threads = [threading.Thread(target=server.serve_forever) for server in servers]
+    for thread in threads:
+        thread.start()
+
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+        batcher.close()
+        if args.unix and os.path.exists(args.unix):
+            os.unlink(args.unix)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+'''
+Solves sudokus read from an async iterator without blocking the event loop, for
+services built on asyncio. For example:
+
+    async for i, result in stream.solve_stream(lines, executor, ordered=False):
+        ...
+
+Sudokus are solved by sudoku._solve_chunk in an executor, either the loop's
+default thread pool or any concurrent.futures executor given, such as a
+ProcessPoolExecutor to solve them in parallel. Only window chunks are solved at
+a time, and the next line is only read from the iterator once one of them is
+finished and its results have been taken, so a slow consumer slows down reading
+rather than letting results pile up.
+
+'''
+
+from collections import deque
+from functools import partial
+import asyncio
+
+import sudoku
+
+
+async def solve_stream(
+    lines,
+    executor=None,
+    ordered=True,
+    window=8,
+    chunk_size=1,
+    incremental=False,
+    engine="grid",
+    techniques=(),
+):
+
+    '''
+    Yields a tuple of the number of every line of lines, an async iterator of
+    strings as read from a .sdk file, and its result. The result is as given by
+    sudoku._solve_chunk: a message from sudoku._parse_line if the line is not a
+    valid sudoku, None if it has no solution, otherwise a tuple of the levels of
+    checking required, the printable string of the solved Grid, its values as
+    a line of a .sdk file, the hits of the expert techniques in techniques and
+    the seconds taken to solve it.
+    Lines are checked just as main in sudoku.py checks them, trailing newlines
+    being allowed.
+    If ordered is True, results are yielded in the order of lines, otherwise as
+    soon as they are solved. Lines are sent to executor chunk_size at a time,
+    a chunk only being sent once it is full or lines has run out, and at most
+    window chunks are solved at a time. Results are yielded as soon as they
+    are ready, even while waiting for the next line. incremental, engine and
+    techniques are given to sudoku.solve.
+
+    '''
+
+    if window < 1 or chunk_size < 1:
+        raise ValueError("window and chunk_size must be at least 1")
+
+    loop = asyncio.get_running_loop()
+    solve_chunk = partial(
+        sudoku._solve_chunk,
+        incremental=incremental,
+        engine=engine,
+        techniques=tuple(techniques),
+    )
+
+    # Every chunk being solved, by the future of its results, along with the
+    # numbers of its lines.
+    pending = deque() if ordered else {}
+
+    def send(numbers, chunk):
+        future = loop.run_in_executor(executor, solve_chunk, chunk)
+        if ordered:
+            pending.append((future, numbers))
+        else:
+            pending[future] = numbers
+
+    def finished():
+        if ordered:
+            done = []
+            while pending and pending[0][0].done():
+                done.append(pending.popleft())
+        else:
+            done = [future for future in pending if future.done()]
+            done = [(future, pending.pop(future)) for future in done]
+
+        return [
+            (i, result)
+            for future, numbers in done
+            for i, result in zip(numbers, future.result()[0])
+        ]
+
+    source = lines.__aiter__()
+    # The task reading the next line, and whether lines has run out.
+    reading, exhausted = None, False
+    numbers, chunk = [], []
+    i = 0
+
+    try:
+        while True:
+            for result in finished():
+                yield result
+
+            if reading is None and not exhausted and len(pending) < window:
+                reading = asyncio.ensure_future(source.__anext__())
+
+            if reading is None and not pending:
+                break
+
+            # Waits for whichever comes first, the next line or a chunk whose
+            # results can be yielded, so that neither waits on the other.
+            waiting = [reading] if reading is not None else []
+            if ordered and pending:
+                waiting.append(pending[0][0])
+            elif not ordered:
+                waiting.extend(pending)
+            await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+
+            if reading is None or not reading.done():
+                continue
+
+            try:
+                line = reading.result()
+            except StopAsyncIteration:
+                exhausted = True
+            else:
+                numbers.append(i)
+                chunk.append(sudoku._parse_line(i, line))
+                i += 1
+            reading = None
+
+            if chunk and (len(chunk) >= chunk_size or exhausted):
+                send(numbers, chunk)
+                numbers, chunk = [], []
+
+    finally:
+        # Chunks not yet started are dropped if the caller stops early.
+        futures = pending if not ordered else [future for future, _ in pending]
+        for future in futures:
+            future.cancel()
+        if reading is not None:
+            reading.cancel()
@@ -1,60 +1,522 @@
-from itertools import product, combinations, chain
-from functools import reduce
-import argparse, pathlib, sys
+from array import array
+from collections import deque
+from itertools import product, chain, combinations, islice
+from functools import partial, lru_cache
+import contextlib, os, sys, time
+
+# argparse, json, multiprocessing, cache and dlx, and so sqlite3, are only
+# imported where they are needed, as importing them all takes longer than
+# solving a sudoku, and many runs need few or none of them.
+
+# Values above 9 are written as letters, so that every value of a 16x16 or
+# 25x25 sudoku is a single character, as are those of a 9x9 sudoku.
+_CHARS = "0123456789ABCDEFGHIJKLMNOP"
+
+# The number of rows, columns and boxes of a sudoku, and of the positions in
+# each, for every number of positions a sudoku can have.
+_SIZES = {81: 9, 256: 16, 625: 25}
+
+# The levels of checking solve tells the user were required to solve the
+# sudoku, in the order they are tried.
+_LEVELS = ("initial_checks", "advanced_checks", "brute_force")
+
+# The ways main can report every sudoku, the first being the default.
+_OUTPUT_MODES = ("pretty", "compact", "jsonl", "none")
+
+
+def _explain(levels, hits=None):
+
+    '''
+    Returns the explanation of levels, a tuple of whether each of _LEVELS was
+    required as given by solve, or None for dancing links, naming the expert
+    techniques in hits, a dict of how many times each changed something, after
+    advanced_checks. Any mix of levels can be explained, a sudoku with every
+    value given needing no checks at all.
+
+    '''
+
+    if levels is None:
+        return "dancing links"
+
+    used = [name for name, level in zip(_LEVELS[:2], levels) if level]
+    if hits:
+        used.append(
+            "expert_checks ("
+            + ", ".join(f"{name} {count}" for name, count in hits.items())
+            + ")"
+        )
+    if levels[2]:
+        used.append("brute_force")
+
+    if not used:
+        return "no checks"
+
+    return " and ".join([", ".join(used[:-1]), used[-1]] if len(used) > 1 else used)
+
+
+def _popcount(mask):
+    return bin(mask).count("1")
+
+
+def _digits(mask):
+    digits = []
+    while mask:
+        bit = mask & -mask
+        digits.append(bit.bit_length())
+        mask ^= bit
+    return tuple(digits)
+
+
+def _cells(mask):
+
+    '''
+    Yields every position in mask, a mask of positions, bit cell being set for
+    the position cell.
+
+    '''
+
+    while mask:
+        bit = mask & -mask
+        yield bit.bit_length() - 1
+        mask ^= bit
+
+
+class Layout:
+    def __init__(self, size):
+
+        '''
+        Holds everything about sudokus of size rows, columns and boxes, each of
+        size positions, which is the same for every sudoku of that size.
+        Possibilities are stored as masks, bit (n - 1) being set when n is
+        possible, and self.all is the mask with every value possible.
+        self.popcount(mask) gives the number of possibilities in mask, and
+        self.digits(mask) the possibilities themselves. For 9x9 sudokus both are
+        looked up in tables made here, so neither has to be worked out again.
+        Subgrid i is row i, column i - size or box i - 2 * size, and
+        self.subgrids[i] holds its positions, read left to right, top to bottom.
+        The subgrids of every position, and the other positions sharing a subgrid
+        with it, its peers, are held in flat arrays of ints, the subgrids of the
+        position cell being self.cell_subgrids[cell * 3 : cell * 3 + 3] and its
+        peers self.peers[cell * self.peer_count : (cell + 1) * self.peer_count].
+        self.peer_masks holds the peers of every position again as a mask of
+        positions, bit cell being set for the position cell, so that the peers
+        shared by several positions are found by AND-ing their masks.
+
+        '''
+
+        self.size = size
+        self.box_size = int(size ** 0.5)
+        self.cells = size * size
+        self.all = (1 << size) - 1
+
+        if size <= 9:
+            popcounts = tuple(_popcount(mask) for mask in range(self.all + 1))
+            digits = tuple(_digits(mask) for mask in range(self.all + 1))
+            self.popcount = popcounts.__getitem__
+            self.digits = digits.__getitem__
+        else:
+            self.popcount = getattr(int, "bit_count", _popcount)
+            self.digits = lru_cache(maxsize=1 << 16)(_digits)
+
+        box = self.box_size
+        self.row_of = tuple(cell // size for cell in range(self.cells))
+        self.col_of = tuple(cell % size for cell in range(self.cells))
+        self.box_of = tuple(
+            self.row_of[cell] // box * box + self.col_of[cell] // box
+            for cell in range(self.cells)
+        )
+
+        self.subgrids = (
+            tuple(tuple(range(i * size, i * size + size)) for i in range(size))
+            + tuple(tuple(range(i, self.cells, size)) for i in range(size))
+            + tuple(
+                tuple(cell for cell in range(self.cells) if self.box_of[cell] == i)
+                for i in range(size)
+            )
+        )
+
+        self.cell_subgrids = array("H")
+        self.peers = array("H")
+        self.peer_count = 3 * size - 2 * box - 1
+        peer_masks = []
+
+        for cell in range(self.cells):
+            indices = (
+                self.row_of[cell],
+                size + self.col_of[cell],
+                2 * size + self.box_of[cell],
+            )
+            peers = set(chain.from_iterable(self.subgrids[i] for i in indices))
+            self.cell_subgrids.extend(indices)
+            self.peers.extend(sorted(peers - {cell}))
+            peer_masks.append(sum(1 << peer for peer in peers - {cell}))
+
+        self.peer_masks = tuple(peer_masks)
+
+
+@lru_cache(maxsize=None)
+def _layout(size):
+    return Layout(size)
+
+
+# Made once at import, so that no 9x9 Grid has to make it.
+_layout(9)
+
+
+@lru_cache(maxsize=1 << 16)
+def _subsets(mask, size):
+
+    '''
+    Returns every mask of size possibilities, all of which are possible in mask,
+    in increasing order.
+
+    '''
+
+    return tuple(
+        sorted(
+            sum(1 << (digit - 1) for digit in digits)
+            for digits in combinations(_digits(mask), size)
+        )
+    )
+
+
+class Board:
+
+    # A Board is made for every sudoku solved, so Boards keep no __dict__.
+    __slots__ = (
+        "layout",
+        "values",
+        "cands",
+        "row_used",
+        "col_used",
+        "box_used",
+        "changes",
+        "empty",
+        "eliminated",
+        "version",
+        "duplicated",
+    )
 
-class Grid:
     def __init__(self, input_grid):
 
+        '''
+        Holds the state of a sudoku in flat lists of integers, read left to right,
+        top to bottom. input_grid may be a 9x9, 16x16 or 25x25 sudoku, and
+        self.layout is the Layout for its size. self.values holds the value of
+        every position, 0 meaning no value, and self.cands holds the
+        possibilities of every position as a mask.
+        self.row_used, self.col_used and self.box_used hold, for every subgrid, a
+        mask of the values already revealed in it. These are kept up to date by
+        self.place and self.unplace, so checking a possibility against the
+        adjacent subgrids of a position is a single AND.
+        While self.changes is a list, every position whose value or possibilities
+        change is appended to it. self.empty counts the positions with no value,
+        and self.eliminated the possibilities removed by self.set_cands.
+        self.version goes up by one with every change, so whether anything has
+        changed since it was last read is a single comparison.
+        self.duplicated is True if input_grid has the same value twice in a row,
+        column or box, in which case it has no solution.
+
+        '''
+
+        self.layout = layout = _layout(_SIZES[len(input_grid)])
+        self.values = [0] * layout.cells
+        self.cands = [layout.all] * layout.cells
+        self.row_used = [0] * layout.size
+        self.col_used = [0] * layout.size
+        self.box_used = [0] * layout.size
+        self.changes = None
+        self.empty = layout.cells
+        self.eliminated = 0
+        self.version = 0
+        self.duplicated = False
+
+        for cell, value in enumerate(input_grid):
+            if value != 0:
+                self.cands[cell] = 1 << (value - 1)
+                self.duplicated |= bool(self.revealed(cell) & self.cands[cell])
+                self.place(cell, value)
+
+    def place(self, cell, value):
+
+        '''
+        Assigns value to the position cell and marks it as revealed in the row,
+        column and box of that position.
+
+        '''
+
+        bit = 1 << (value - 1)
+        layout = self.layout
+        self.values[cell] = value
+        self.row_used[layout.row_of[cell]] |= bit
+        self.col_used[layout.col_of[cell]] |= bit
+        self.box_used[layout.box_of[cell]] |= bit
+        self.empty -= 1
+        self.version += 1
+        if self.changes is not None:
+            self.changes.append(cell)
+
+    def unplace(self, cell):
+
+        '''
+        Removes the value of the position cell, and unmarks it as revealed in the
+        row, column and box of that position.
+
+        '''
+
+        bit = ~(1 << (self.values[cell] - 1))
+        layout = self.layout
+        self.values[cell] = 0
+        self.row_used[layout.row_of[cell]] &= bit
+        self.col_used[layout.col_of[cell]] &= bit
+        self.box_used[layout.box_of[cell]] &= bit
+        self.empty += 1
+        self.version += 1
+        if self.changes is not None:
+            self.changes.append(cell)
+
+    def set_cands(self, cell, mask):
+
+        '''
+        Replaces the possibilities of the position cell with mask.
+
+        '''
+
+        self.eliminated += self.layout.popcount(self.cands[cell] & ~mask)
+        self.cands[cell] = mask
+        self.version += 1
+        if self.changes is not None:
+            self.changes.append(cell)
+
+    def revealed(self, cell):
+
+        '''
+        Returns a mask of every value revealed in the row, column or box of the
+        position cell.
+
+        '''
+
+        layout = self.layout
+        return (
+            self.row_used[layout.row_of[cell]]
+            | self.col_used[layout.col_of[cell]]
+            | self.box_used[layout.box_of[cell]]
+        )
+
+    def snapshot(self):
+
+        '''
+        Returns the values and possibilities of every position, the masks of
+        revealed values and the count of positions with no value, copied into a
+        single list, which self.restore puts back.
+
+        '''
+
+        return (
+            self.values
+            + self.cands
+            + self.row_used
+            + self.col_used
+            + self.box_used
+            + [self.empty]
+        )
+
+    def restore(self, snapshot):
+
+        '''
+        Puts back the state copied by self.snapshot, counting it as a change.
+
+        '''
+
+        cells, size = self.layout.cells, self.layout.size
+        self.values[:] = snapshot[:cells]
+        self.cands[:] = snapshot[cells : 2 * cells]
+        self.row_used[:] = snapshot[2 * cells : 2 * cells + size]
+        self.col_used[:] = snapshot[2 * cells + size : 2 * cells + 2 * size]
+        self.box_used[:] = snapshot[2 * cells + 2 * size : 2 * cells + 3 * size]
+        self.empty = snapshot[-1]
+        self.version += 1
+
+
+class Stats:
+
+    # The methods of Grid which Stats counts, in the order they are reported.
+    METHODS = (
+        "adjacent_elimination",
+        "one_possibility",
+        "only_instance",
+        "identical_possibilities",
+        "unique_possibilities",
+        "box_line_intersection",
+        "x_wing",
+        "swordfish",
+        "jellyfish",
+        "xy_wing",
+        "xyz_wing",
+        "simple_coloring",
+        "brute_force",
+    )
+
+    def __init__(self):
+
+        '''
+        Counts, for every method in self.METHODS, how many times it changed
+        something in self.fired, how many possibilities it removed in
+        self.removed, and the time spent in it in self.seconds. Also counts the
+        steps taken by Grid.brute_force in self.nodes, and the most values it
+        guessed at once in self.max_depth.
+        A Stats object given to several Grid objects totals them all, and the
+        totals of another Stats object can be added with self.merge.
+
+        '''
+
+        self.fired = dict.fromkeys(self.METHODS, 0)
+        self.removed = dict.fromkeys(self.METHODS, 0)
+        self.seconds = dict.fromkeys(self.METHODS, 0.0)
+        self.nodes = 0
+        self.max_depth = 0
+
+    def merge(self, other):
+        for name in self.METHODS:
+            self.fired[name] += other.fired[name]
+            self.removed[name] += other.removed[name]
+            self.seconds[name] += other.seconds[name]
+        self.nodes += other.nodes
+        self.max_depth = max(self.max_depth, other.max_depth)
+
+    def __str__(self):
+        lines = [f"{'method':<26}{'fired':>10}{'removed':>10}{'seconds':>10}"]
+        for name in self.METHODS:
+            lines.append(
+                f"{name:<26}{self.fired[name]:>10}{self.removed[name]:>10}"
+                f"{self.seconds[name]:>10.3f}"
+            )
+        lines.append(f"brute_force nodes {self.nodes}, max depth {self.max_depth}")
+        return "\n".join(lines)
+
+
+class Grid:
+
+    # The techniques of self.expert_checks, in the order they are tried by
+    # default, the cheapest and most often useful first.
+    TECHNIQUES = (
+        "x_wing",
+        "xy_wing",
+        "xyz_wing",
+        "swordfish",
+        "simple_coloring",
+        "jellyfish",
+    )
+
+    def __init__(self, input_grid, stats=None, techniques=()):
+
         '''
         When talking generally about a row, column, or box, we will call it a
         subgrid.
-        Defines the starting values of the Grid object by instantiating a Square
-        object for every position on the 9x9 grid of the sudoku and adding these
-        Square objects to the attribute self.grid_tuple, a tuple of every Square
-        object read left to right, top to bottom.
-        Also defines an attribute for every subgrid. Assigns a tuple
-        to each of these attributes, and defines the tuple such that the correct
-        Square objects will be members.
-        Finally, defines tuples self.rows, self.columns, self.boxes, which are 
-        defined such that for each, every corresponding subgrid will be a 
-        member. Counting the subgrids left to right, top to bottom.
+        The values and possibilities of the 9x9, 16x16 or 25x25 sudoku are held
+        in self.board, and the checks work on its positions directly, each
+        subgrid being a tuple of positions from self.layout.subgrids. Nothing
+        else is made, so making a Grid costs little more than making its Board.
+        Square objects are only made when asked for: self.grid_tuple, a tuple of
+        every Square read left to right, top to bottom, self.rows, self.cols and
+        self.boxes, tuples of the Squares of every subgrid, and the attributes
+        cart_{col}_{row}, row_{i}, col_{i} and box_{i} are all made the first
+        time they are used. Every Square reads from and writes to self.board.
+        If stats is a Stats object, every method it counts is replaced on this
+        Grid with one which also adds to stats. Otherwise nothing is counted and
+        the methods are left as they are.
+        techniques names the methods self.expert_checks tries, in order, from
+        self.TECHNIQUES. By default there are none, and it never changes
+        anything. self.hits counts how many times each changed something.
 
         '''
 
         self.input_grid = input_grid
-
-        for row, col in product(range(9), repeat=2):
-            setattr(
-                self,
-                f"cart_{str(col)}_{str(row)}",
-                Square(col, row, self.input_grid[row * 9 + col]),
+        self.board = Board(input_grid)
+        self.layout = self.board.layout
+        self.stats = stats
+        self.squares = None
+        self.techniques = tuple(techniques)
+        self.hits = {}
+
+        if stats is not None:
+            for name in Stats.METHODS:
+                setattr(self, name, self._counted(name, getattr(self, name)))
+
+    @property
+    def grid_tuple(self):
+        if self.squares is None:
+            size = self.layout.size
+            self.squares = tuple(
+                Square(col, row, self.board)
+                for row, col in product(range(size), repeat=2)
             )
+        return self.squares
+
+    @property
+    def rows(self):
+        return self._square_subgrids(0)
 
-        self.grid_tuple = tuple(
-            getattr(self, f"cart_{str(col)}_{str(row)}")
-            for col, row in product(range(9), repeat=2)
+    @property
+    def cols(self):
+        return self._square_subgrids(1)
+
+    @property
+    def boxes(self):
+        return self._square_subgrids(2)
+
+    def _square_subgrids(self, kind):
+        size, squares = self.layout.size, self.grid_tuple
+        return tuple(
+            tuple(squares[cell] for cell in subgrid)
+            for subgrid in self.layout.subgrids[kind * size : kind * size + size]
         )
 
-        for i in range(9):
-            setattr(
-                self,
-                f"row_{i}",
-                tuple(square for square in self.grid_tuple if square.row == i),
-            )
-            setattr(
-                self,
-                f"col_{i}",
-                tuple(square for square in self.grid_tuple if square.col == i),
-            )
-            setattr(
-                self,
-                f"box_{i}",
-                tuple(square for square in self.grid_tuple if square.box == i),
-            )
+    def __getattr__(self, name):
+
+        '''
+        Gives the Square cart_{col}_{row} and the subgrids row_{i}, col_{i} and
+        box_{i}, as tuples of Squares.
+
+        '''
+
+        kind, _, index = name.partition("_")
+        index = [int(i) for i in index.split("_") if i.isdigit()]
+        kinds = ("row", "col", "box")
+
+        if "layout" in self.__dict__ and all(i < self.layout.size for i in index):
+
+            if kind == "cart" and len(index) == 2:
+                col, row = index
+                return self.grid_tuple[row * self.layout.size + col]
 
-        self.rows = tuple(getattr(self, f"row_{i}") for i in range(9))
-        self.cols = tuple(getattr(self, f"col_{i}") for i in range(9))
-        self.boxes = tuple(getattr(self, f"box_{i}") for i in range(9))
+            if kind in kinds and len(index) == 1:
+                return self._square_subgrids(kinds.index(kind))[index[0]]
+
+        raise AttributeError(name)
+
+    def _counted(self, name, method):
+
+        '''
+        Returns method wrapped so that calling it adds to self.stats under name.
+
+        '''
+
+        stats, board = self.stats, self.board
+
+        def counted(*args, **kwargs):
+            eliminated = board.eliminated
+            start = time.perf_counter()
+            changed = method(*args, **kwargs)
+            stats.seconds[name] += time.perf_counter() - start
+
+            if changed:
+                stats.fired[name] += 1
+                stats.removed[name] += board.eliminated - eliminated
+
+            return changed
+
+        return counted
 
     def initial_checks(self):
 
@@ -77,69 +539,57 @@ class Grid:
 
         '''
 
-        for square in (s for s in self.grid_tuple if s.value == 0):
+        values = self.board.values
+
+        for cell in range(self.layout.cells):
 
-            if self.adjacent_elimination(square):
+            if values[cell] == 0 and self.adjacent_elimination(cell):
                 return True
 
-        for square in (s for s in self.grid_tuple if s.value == 0):
+        for cell in range(self.layout.cells):
 
-            if self.one_possibility(square):
+            if values[cell] == 0 and self.one_possibility(cell):
                 return True
 
-        for subgrid in self.rows + self.cols + self.boxes:
+        for subgrid in self.layout.subgrids:
 
             if self.only_instance(subgrid):
                 return True
 
         return False
 
-    def adjacent_elimination(self, square):
+    def adjacent_elimination(self, cell):
 
         '''
-        For possibilities in Square, if this possibility is already revealed in
-        another Square in an adjacent subgrid, remove this possibility from Square
-        and return True.
+        For possibilities in the Square at position cell, if this possibility is
+        already revealed in another Square in an adjacent subgrid, remove this
+        possibility from the Square and return True.
 
         '''
 
-        row_values = tuple(s.value for s in getattr(self, f"row_{square.row}"))
-        col_values = tuple(s.value for s in getattr(self, f"col_{square.col}"))
-        box_values = tuple(s.value for s in getattr(self, f"box_{square.box}"))
+        cands = self.board.cands
+        revealed = self.board.revealed(cell)
 
-        check_rows = lambda x: x in row_values
-        check_cols = lambda x: x in col_values
-        check_boxes = lambda x: x in box_values
-
-        filtered_rows = list(filter(check_rows, square.poss))
-        filtered_cols = list(filter(check_cols, square.poss))
-        filtered_boxes = list(filter(check_boxes, square.poss))
-
-        if 0 < len(filtered_rows) + len(filtered_boxes) + len(filtered_cols):
-            square.poss = [
-                poss
-                for poss in square.poss
-                if (
-                    (poss not in filtered_rows)
-                    and (poss not in filtered_cols)
-                    and (poss not in filtered_boxes)
-                )
-            ]
+        if cands[cell] & revealed:
+            self.board.set_cands(cell, cands[cell] & ~revealed)
             return True
 
         else:
             return False
 
-    def one_possibility(self, square):
+    def one_possibility(self, cell):
 
         '''
-        If there exists only one possibility in Square, then assign this possibility
-        to the Square's value and return True. Else, return False.
+        If there exists only one possibility in the Square at position cell, then
+        assign this possibility to the Square's value and return True. Else,
+        return False.
 
         '''
 
-        if len(square.poss) == 1:
-            square.value = square.poss[0]
+        mask = self.board.cands[cell]
+
+        if self.layout.popcount(mask) == 1:
+            self.board.place(cell, mask.bit_length())
             return True
 
         else:
@@ -154,20 +604,30 @@ class Grid:
 
         '''
 
-        not_determined = tuple(
-            i for i in range(1, 10) if all(i != square.value for square in subgrid)
-        )
+        board = self.board
+        cands = board.cands
 
-        for possibility in not_determined:
-            possible_in = tuple(
-                square for square in subgrid if possibility in square.poss
-            )
-            if len(possible_in) == 1:
-                possible_in[0].poss = [possibility]
-                possible_in[0].value = possibility
-                return True
+        # seen_once collects every possibility found in the subgrid, seen_twice
+        # those found in more than one Square.
+        determined, seen_once, seen_twice = 0, 0, 0
+        for cell in subgrid:
+            if board.values[cell] != 0:
+                determined |= 1 << (board.values[cell] - 1)
+            seen_twice |= seen_once & cands[cell]
+            seen_once |= cands[cell]
 
-        return False
+        only_once = seen_once & ~seen_twice & ~determined
+
+        if not only_once:
+            return False
+
+        # Lowest possibility first, as the possibilities were checked in order.
+        bit = only_once & -only_once
+        for cell in subgrid:
+            if cands[cell] & bit:
+                board.set_cands(cell, bit)
+                board.place(cell, bit.bit_length())
+                return True
 
     def advanced_checks(self):
 
@@ -181,22 +641,24 @@ class Grid:
 
         '''
 
-        for i, subgrid in product(range(2, 9), self.rows + self.cols + self.boxes):
+        for i, subgrid in product(range(2, 5), self.layout.subgrids):
 
             if self.identical_possibilities(subgrid, i):
                 return True
 
-        for i, subgrid in product(range(2, 9), self.rows + self.cols + self.boxes):
+        for i, subgrid in product(range(2, 5), self.layout.subgrids):
 
             if self.unique_possibilities(subgrid, i):
                 return True
 
-        for subgrid in self.rows + self.cols:
+        size = self.layout.size
+
+        for subgrid in self.layout.subgrids[: 2 * size]:
 
             if self.box_line_intersection(subgrid, True):
                 return True
 
-        for subgrid in self.boxes:
+        for subgrid in self.layout.subgrids[2 * size :]:
 
             if self.box_line_intersection(subgrid, False):
                 return True
@@ -206,50 +668,45 @@ class Grid:
     def identical_possibilities(self, subgrid, i):
 
         '''
-        If there exist i Squares in subgrid, which have i possibilities which are
-        identical to each other, remove these possibilities from every other Square
+        If there exist i Squares in subgrid whose possibilities are all among the
+        same i possibilities, remove these possibilities from every other Square
         in the subgrid, return True. Else, return False.
+        Only i up to half the Squares with no value in subgrid are checked. The
+        other Squares of a larger group share the remaining possibilities between
+        them, which self.unique_possibilities finds, making the same changes. For
+        16x16 and 25x25 sudokus, groups of more than 4 are not looked for.
 
         '''
 
-        not_determined = tuple(square for square in subgrid if square.value == 0)
+        board = self.board
+        cands = board.cands
 
-        if len(not_determined) <= i:
-            return False
-
-        check_these = tuple(
-            square for square in not_determined if len(square.poss) == i
+        not_determined = tuple(
+            cell for cell in subgrid if board.values[cell] == 0
         )
 
-        if len(check_these) < i:
+        if i > len(not_determined) // 2:
             return False
 
-        square_combs = combinations(check_these, i)
-        poss_equality = lambda x: all(x[0].poss == y.poss for y in x[1:])
-        identical_poss = tuple(filter(poss_equality, square_combs))
-
-        if len(identical_poss) == 0:
-            return False
+        # Only Squares with at most i possibilities can be among the i Squares.
+        popcount = self.layout.popcount
+        undetermined = 0
+        for cell in not_determined:
+            if popcount(cands[cell]) <= i:
+                undetermined |= cands[cell]
 
-        subgrid_poss_copy = tuple(square.poss.copy() for square in not_determined)
+        version = board.version
+        for mask in _subsets(undetermined, i):
+            inside = tuple(cell for cell in not_determined if not cands[cell] & ~mask)
 
-        for equal_squares in identical_poss:
-            removable_poss = equal_squares[0].poss
-            poss_square_grid = (
-                (remove_from, remove_this)
-                for (remove_from, remove_this) in product(
-                    not_determined, removable_poss
-                )
-                if (
-                    (remove_this in remove_from.poss)
-                    and (remove_from not in equal_squares)
-                )
-            )
+            if len(inside) != i:
+                continue
 
-            for remove_from, remove_this in poss_square_grid:
-                remove_from.poss.remove(remove_this)
+            for cell in not_determined:
+                if cands[cell] & mask and cell not in inside:
+                    board.set_cands(cell, cands[cell] & ~mask)
 
-        return subgrid_poss_copy != tuple(square.poss for square in not_determined)
+        return board.version != version
 
     def unique_possibilities(self, subgrid, i):
 
@@ -257,46 +714,51 @@ class Grid:
         If there exist i Squares in subgrid which share i possibilities not found in
         any other Square in subgrid, then remove all other possibilities from the i 
         Squares, return True. Else, return False.
+        For every possibility, a mask of the Squares it is possible in is made, so
+        the Squares sharing any i possibilities are found by OR-ing i masks. As for
+        self.identical_possibilities, only i up to half the Squares with no value
+        in subgrid are checked.
 
         '''
 
-        not_determined = tuple(square for square in subgrid if square.value == 0)
-
-        if len(not_determined) <= i:
-            return False
-
-        subgrid_poss_copy = tuple(square.poss.copy() for square in not_determined)
+        board = self.board
+        cands = board.cands
 
-        square_combs = combinations(not_determined, i)
-        intersection = lambda x, y: x & y
-        shared_poss = tuple(
-            (
-                sorted(list(reduce(intersection, (set(s.poss) for s in squares)))),
-                squares,
-            )
-            for squares in square_combs
+        not_determined = tuple(
+            cell for cell in subgrid if board.values[cell] == 0
         )
 
-        for (intersecting_poss, squares) in shared_poss:
-            check_squares = tuple(
-                square for square in not_determined if square not in squares
-            )
-            check_poss = sorted(
-                tuple(
-                    set(
-                        chain.from_iterable(square.poss for square in check_squares)
-                    )
-                )
-            )
+        if i > len(not_determined) // 2:
+            return False
 
-            poss_combs = combinations(intersecting_poss, i)
+        popcount, digits = self.layout.popcount, self.layout.digits
+        possible_in = [0] * (self.layout.size + 1)
+        for index, cell in enumerate(not_determined):
+            for possibility in digits(cands[cell]):
+                possible_in[possibility] |= 1 << index
+
+        # Only possibilities found in at most i Squares can be among the i
+        # possibilities.
+        undetermined = 0
+        for possibility, squares in enumerate(possible_in):
+            if squares and popcount(squares) <= i:
+                undetermined |= 1 << (possibility - 1)
+
+        version = board.version
+        for mask in _subsets(undetermined, i):
+            squares = 0
+            for possibility in digits(mask):
+                squares |= possible_in[possibility]
+
+            if popcount(squares) != i:
+                continue
 
-            for poss in poss_combs:
-                if all(p not in check_poss for p in poss):
-                    for square in squares:
-                        square.poss = sorted(list(poss))
+            for index in digits(squares):
+                cell = not_determined[index - 1]
+                if cands[cell] & ~mask:
+                    board.set_cands(cell, cands[cell] & mask)
 
-        return subgrid_poss_copy != tuple(square.poss for square in not_determined)
+        return board.version != version
 
     def box_line_intersection(self, subgrid, is_line):
 
@@ -314,352 +776,1606 @@ class Grid:
 
         '''
 
-        grid_poss_copy = tuple(square.poss.copy() for square in self.grid_tuple)
+        board = self.board
+        cands = board.cands
 
-        not_determined = tuple(
-            i for i in range(1, 10) if all(i != square.value for square in subgrid)
-        )
+        determined = 0
+        layout = self.layout
+        size, subgrids = layout.size, layout.subgrids
+        row_of, col_of, box_of = layout.row_of, layout.col_of, layout.box_of
 
-        for possibility in not_determined:
-            possible_in = tuple(
-                square for square in subgrid if possibility in square.poss
-            )
+        for cell in subgrid:
+            if board.values[cell] != 0:
+                determined |= 1 << (board.values[cell] - 1)
+
+        version = board.version
+        for possibility in layout.digits(layout.all & ~determined):
+            bit = 1 << (possibility - 1)
+            possible_in = tuple(cell for cell in subgrid if cands[cell] & bit)
 
             if len(possible_in) < 2:
                 continue
 
-            if is_line and all(
-                possible_in[0].box == square.box for square in possible_in[1:]
-            ):
-                remove_from = tuple(
-                    square
-                    for square in getattr(self, f"box_{possible_in[0].box}")
-                    if (possibility in square.poss) and (square not in subgrid)
-                )
+            first, rest = possible_in[0], possible_in[1:]
+            remove_from = ()
 
-                for square in remove_from:
-                    square.poss.remove(possibility)
+            if is_line and all(box_of[first] == box_of[cell] for cell in rest):
+                remove_from = subgrids[2 * size + box_of[first]]
 
-            if not is_line and all(
-                possible_in[0].row == square.row for square in possible_in[1:]
-            ):
-                remove_from = tuple(
-                    square
-                    for square in getattr(self, f"row_{possible_in[0].row}")
-                    if (possibility in square.poss) and (square not in subgrid)
-                )
+            if not is_line and all(row_of[first] == row_of[cell] for cell in rest):
+                remove_from = subgrids[row_of[first]]
 
-                for square in remove_from:
-                    square.poss.remove(possibility)
+            if not is_line and all(col_of[first] == col_of[cell] for cell in rest):
+                remove_from = subgrids[size + col_of[first]]
 
-            if not is_line and all(
-                possible_in[0].col == square.col for square in possible_in[1:]
-            ):
-                remove_from = tuple(
-                    square
-                    for square in getattr(self, f"col_{possible_in[0].col}")
-                    if (possibility in square.poss) and (square not in subgrid)
-                )
+            for cell in remove_from:
+                if cands[cell] & bit and cell not in subgrid:
+                    board.set_cands(cell, cands[cell] & ~bit)
 
-                for square in remove_from:
-                    square.poss.remove(possibility)
+        return board.version != version
+
+    def expert_checks(self):
+
+        '''
+        If self.advanced_checks can make no more progress, these checks might
+        still find possibilities to remove before resorting to brute force. Each
+        technique in self.techniques is tried in turn, and as soon as one removes
+        a possibility, it is counted in self.hits and True is returned, so that
+        the loop starts at the beginning again. If none does, returns False.
+        The techniques look at one value at a time, through a mask of the
+        positions it is possible in, so that the positions seeing one or more
+        others are found by AND-ing masks of self.layout.peer_masks.
+
+        '''
+
+        for name in self.techniques:
+
+            if getattr(self, name)():
+                self.hits[name] = self.hits.get(name, 0) + 1
+                return True
 
-        return grid_poss_copy != tuple(square.poss for square in self.grid_tuple)
+        return False
 
-    def brute_force(self):
+    def _positions(self):
 
         '''
-        Copied from Professor Thorsten Altenkirch.
-        https://www.youtube.com/watch?v=G_UYXzGuqvM&t=106s
+        Returns a list of masks of positions, one for every value, of the
+        positions with no value where that value is possible. The first is
+        always 0, so that the list can be indexed by value.
 
         '''
 
-        for square in tuple(s for s in self.grid_tuple if s.value == 0):
-            for poss in range(1, 10):
+        values, cands = self.board.values, self.board.cands
+        digits = self.layout.digits
+        positions = [0] * (self.layout.size + 1)
 
-                if poss not in tuple(
-                    s.value
-                    for s in getattr(self, f"row_{square.row}")
-                    + getattr(self, f"col_{square.col}")
-                    + getattr(self, f"box_{square.box}")
-                ):
-                    square.value = poss
-                    self.brute_force()
-                    square.value = 0
+        for cell in range(self.layout.cells):
+            if values[cell] == 0:
+                for possibility in digits(cands[cell]):
+                    positions[possibility] |= 1 << cell
 
-            return
+        return positions
 
-        self.solution = tuple(s.value for s in self.grid_tuple)
+    def _remove(self, bit, mask):
 
-    def board_full(self):
-        return all(square.value != 0 for square in self.grid_tuple)
+        '''
+        Removes the possibility bit from every position in mask, a mask of
+        positions, which has no value.
 
-    def __str__(self):
+        '''
+
+        board = self.board
+        values, cands = board.values, board.cands
+
+        for cell in _cells(mask):
+            if values[cell] == 0 and cands[cell] & bit:
+                board.set_cands(cell, cands[cell] & ~bit)
+
+    def _fish(self, n):
 
         '''
-        Defines the printable string representation.
+        If there exist n rows in which a possibility is only possible within the
+        same n columns, it must be in those columns within those rows, so remove
+        it from every other Square of the columns. Likewise with rows and columns
+        swapped. Return True if a possibility was removed. Else, return False.
 
         '''
 
-        return f"\n\n	       {self.cart_0_0.value}  |  {self.cart_1_0.value}\
-  |  {self.cart_2_0.value}  |  {self.cart_3_0.value}  |  {self.cart_4_0.value}\
-  |  {self.cart_5_0.value}  |  {self.cart_6_0.value}  |  {self.cart_7_0.value}\
-  |  {self.cart_8_0.value}  \n\
-		-----|-----|-----|-----|-----|-----|-----|-----|-----\n\
-		  {self.cart_0_1.value}  |  {self.cart_1_1.value}  |  {self.cart_2_1.value}\
-  |  {self.cart_3_1.value}  |  {self.cart_4_1.value}  |  {self.cart_5_1.value}\
-  |  {self.cart_6_1.value}  |  {self.cart_7_1.value}  |  {self.cart_8_1.value}  \n\
-		-----|-----|-----|-----|-----|-----|-----|-----|-----\n\
-		  {self.cart_0_2.value}  |  {self.cart_1_2.value}  |  {self.cart_2_2.value}\
-  |  {self.cart_3_2.value}  |  {self.cart_4_2.value}  |  {self.cart_5_2.value}\
-  |  {self.cart_6_2.value}  |  {self.cart_7_2.value}  |  {self.cart_8_2.value}  \n\
-		-----|-----|-----|-----|-----|-----|-----|-----|-----\n\
-		  {self.cart_0_3.value}  |  {self.cart_1_3.value}  |  {self.cart_2_3.value}\
-  |  {self.cart_3_3.value}  |  {self.cart_4_3.value}  |  {self.cart_5_3.value}\
-  |  {self.cart_6_3.value}  |  {self.cart_7_3.value}  |  {self.cart_8_3.value}  \n\
-		-----|-----|-----|-----|-----|-----|-----|-----|-----\n\
-		  {self.cart_0_4.value}  |  {self.cart_1_4.value}  |  {self.cart_2_4.value}\
-  |  {self.cart_3_4.value}  |  {self.cart_4_4.value}  |  {self.cart_5_4.value}\
-  |  {self.cart_6_4.value}  |  {self.cart_7_4.value}  |  {self.cart_8_4.value}  \n\
-		-----|-----|-----|-----|-----|-----|-----|-----|-----\n\
-		  {self.cart_0_5.value}  |  {self.cart_1_5.value}  |  {self.cart_2_5.value}\
-  |  {self.cart_3_5.value}  |  {self.cart_4_5.value}  |  {self.cart_5_5.value}\
-  |  {self.cart_6_5.value}  |  {self.cart_7_5.value}  |  {self.cart_8_5.value}  \n\
-		-----|-----|-----|-----|-----|-----|-----|-----|-----\n\
-		  {self.cart_0_6.value}  |  {self.cart_1_6.value}  |  {self.cart_2_6.value}\
-  |  {self.cart_3_6.value}  |  {self.cart_4_6.value}  |  {self.cart_5_6.value}\
-  |  {self.cart_6_6.value}  |  {self.cart_7_6.value}  |  {self.cart_8_6.value}  \n\
-		-----|-----|-----|-----|-----|-----|-----|-----|-----\n\
-		  {self.cart_0_7.value}  |  {self.cart_1_7.value}  |  {self.cart_2_7.value}\
-  |  {self.cart_3_7.value}  |  {self.cart_4_7.value}  |  {self.cart_5_7.value}\
-  |  {self.cart_6_7.value}  |  {self.cart_7_7.value}  |  {self.cart_8_7.value}  \n\
-		-----|-----|-----|-----|-----|-----|-----|-----|-----\n\
-		  {self.cart_0_8.value}  |  {self.cart_1_8.value}  |  {self.cart_2_8.value}\
-  |  {self.cart_3_8.value}  |  {self.cart_4_8.value}  |  {self.cart_5_8.value}\
-  |  {self.cart_6_8.value}  |  {self.cart_7_8.value}  |  {self.cart_8_8.value}  \n\n"
+        board, layout = self.board, self.layout
+        cands = board.cands
+        size, subgrids = layout.size, layout.subgrids
+        popcount, digits = layout.popcount, layout.digits
 
+        version = board.version
+        for possibility, positions in enumerate(self._positions()):
+            if not positions:
+                continue
 
-class Square:
-    def __init__(self, col, row, value):
+            bit = 1 << (possibility - 1)
+
+            # Rows as the n lines and columns crossing them, then the other way.
+            for base, cover in ((0, size), (size, 0)):
+
+                # For every line with from 2 to n Squares where the possibility
+                # is possible, a mask of the crossing lines those Squares are in.
+                lines = []
+                for i in range(size):
+                    crossing = 0
+                    for j, cell in enumerate(subgrids[base + i]):
+                        if positions >> cell & 1:
+                            crossing |= 1 << j
+
+                    if 2 <= popcount(crossing) <= n:
+                        lines.append((i, crossing))
+
+                for group in combinations(lines, n):
+                    crossing = 0
+                    for _, line in group:
+                        crossing |= line
+
+                    if popcount(crossing) != n:
+                        continue
+
+                    inside = set(i for i, _ in group)
+                    for j in digits(crossing):
+                        for i, cell in enumerate(subgrids[cover + j - 1]):
+                            if i not in inside and cands[cell] & bit:
+                                board.set_cands(cell, cands[cell] & ~bit)
+
+        return board.version != version
+
+    def x_wing(self):
 
         '''
-        Uses row, col to determine self.row, self.col, and self.box. Uses
-        value to determine self.value and self.poss.
+        Removes possibilities by self._fish with 2 rows and columns. Returns True
+        if a possibility was removed.
 
         '''
 
-        self.row = row
-        self.col = col
-        box_classifier = {
-            (0, 0): 0,
-            (1, 0): 0,
-            (2, 0): 0,
-            (0, 1): 0,
-            (1, 1): 0,
-            (2, 1): 0,
-            (0, 2): 0,
-            (1, 2): 0,
-            (2, 2): 0,
-            (3, 0): 1,
-            (4, 0): 1,
-            (5, 0): 1,
-            (3, 1): 1,
-            (4, 1): 1,
-            (5, 1): 1,
-            (3, 2): 1,
-            (4, 2): 1,
-            (5, 2): 1,
-            (6, 0): 2,
-            (7, 0): 2,
-            (8, 0): 2,
-            (6, 1): 2,
-            (7, 1): 2,
-            (8, 1): 2,
-            (6, 2): 2,
-            (7, 2): 2,
-            (8, 2): 2,
-            (0, 3): 3,
-            (1, 3): 3,
-            (2, 3): 3,
-            (0, 4): 3,
-            (1, 4): 3,
-            (2, 4): 3,
-            (0, 5): 3,
-            (1, 5): 3,
-            (2, 5): 3,
-            (3, 3): 4,
-            (4, 3): 4,
-            (5, 3): 4,
-            (3, 4): 4,
-            (4, 4): 4,
-            (5, 4): 4,
-            (3, 5): 4,
-            (4, 5): 4,
-            (5, 5): 4,
-            (6, 3): 5,
-            (7, 3): 5,
-            (8, 3): 5,
-            (6, 4): 5,
-            (7, 4): 5,
-            (8, 4): 5,
-            (6, 5): 5,
-            (7, 5): 5,
-            (8, 5): 5,
-            (0, 6): 6,
-            (1, 6): 6,
-            (2, 6): 6,
-            (0, 7): 6,
-            (1, 7): 6,
-            (2, 7): 6,
-            (0, 8): 6,
-            (1, 8): 6,
-            (2, 8): 6,
-            (3, 6): 7,
-            (4, 6): 7,
-            (5, 6): 7,
-            (3, 7): 7,
-            (4, 7): 7,
-            (5, 7): 7,
-            (3, 8): 7,
-            (4, 8): 7,
-            (5, 8): 7,
-            (6, 6): 8,
-            (7, 6): 8,
-            (8, 6): 8,
-            (6, 7): 8,
-            (7, 7): 8,
-            (8, 7): 8,
-            (6, 8): 8,
-            (7, 8): 8,
-            (8, 8): 8,
-        }
-
-        self.box = box_classifier[(col, row)]
-
-        if value == 0:
-            self.value = 0
-            self.poss = [1, 2, 3, 4, 5, 6, 7, 8, 9]
-        else:
-            self.value = value
-            self.poss = [value]
+        return self._fish(2)
 
+    def swordfish(self):
 
-def _parse_args(parser, args=None):
+        '''
+        Removes possibilities by self._fish with 3 rows and columns. Returns True
+        if a possibility was removed.
 
-    parser.add_argument(
-        "in_path",
-        help="A valid path to a .sdk file containing the unsolved grids.",
-        nargs="?",
-    )
-    parser.add_argument(
-        "out_path",
-        help="A valid path to a .sdk file containing the solved grids",
-        nargs="?",
-    )
-    return parser.parse_args(args)
+        '''
 
+        return self._fish(3)
 
-def main():
+    def jellyfish(self):
 
-    parser = argparse.ArgumentParser()
-    args = _parse_args(parser)
+        '''
+        Removes possibilities by self._fish with 4 rows and columns. Returns True
+        if a possibility was removed.
 
-    if args.in_path:
-        input_path = pathlib.Path(str(args.in_path))
-        if not input_path.exists():
-            print("Not a valid input path")
-            sys.exit(1)
-        if not input_path.suffix == ".sdk":
-            print("Input is not a .sdk file.")
-            sys.exit(1)
-    else:
-        print("Please enter a valid path containing the unsolved sudokus.")
-        sys.exit(1)
+        '''
 
-    if args.out_path:
-        output_path = pathlib.Path(args.out_path)
-        if output_path.exists():
-            print("This file already exists")
-            sys.exit(1)
-        if not output_path.suffix == ".sdk":
-            print("Output is not a .sdk file.")
-            sys.exit(1)
+        return self._fish(4)
 
-    # Allows the solver to tell the user which level of checking was 
-    # required to solve the sudoku.
-    explanation = {
-        (True, False, False): "initial_checks",
-        (True, True, False): "initial_checks and advanced_checks",
-        (True, True, True): "initial_checks, advanced_checks and brute_force",
-        (True, False, True): "initial_checks and brute_force",
-    }
+    def xy_wing(self):
 
-    with input_path.open("r") as reader:
-        unsolved_strings = reader.readlines()
+        '''
+        If there exists a Square with the two possibilities a and b, which sees a
+        Square with the possibilities a and c and another with b and c, then
+        whichever of a or b the first Square takes, one of the others must be c.
+        Remove c from every Square seeing both of them, return True. Else, return
+        False.
 
-    grid_list = []
+        '''
 
-    for i, input_string in enumerate(unsolved_strings):
+        board, layout = self.board, self.layout
+        values, cands = board.values, board.cands
+        popcount, peer_masks = layout.popcount, layout.peer_masks
 
-        input_grid = tuple(char for char in input_string if char != "\n")
+        pairs = tuple(
+            cell
+            for cell in range(layout.cells)
+            if values[cell] == 0 and popcount(cands[cell]) == 2
+        )
 
-        if any(char not in "0123456789" for char in input_grid):
-            print(f"Not all characters in sudoku {i} are integers.")
-            sys.exit(1)
+        version = board.version
+        for pivot in pairs:
+            wings = [cell for cell in pairs if peer_masks[pivot] >> cell & 1]
 
-        elif len(input_grid) != 81:
-            print(f"Sudoku {i} does not have 81 characters.")
-            sys.exit(1)
+            for first, second in combinations(wings, 2):
+                shared = cands[first] & cands[second]
 
-        input_grid = tuple(int(char) for char in input_grid)
-        grid_list.append(input_grid)
+                if popcount(shared) != 1 or shared & cands[pivot]:
+                    continue
 
-    for i, input_grid in enumerate(grid_list):
+                if (cands[first] | cands[second]) & ~shared == cands[pivot]:
+                    self._remove(shared, peer_masks[first] & peer_masks[second])
 
-        # Before attempting to solve the sudoku, no checking has occurred, 
-        # so all the below values are False. If one of the below is ever
-        # successful in removing a possibility from a Square, determining
-        # a value, or finishing the solution, the appropriate variable is
-        # set to True.
-        initial_checks, advanced_checks, brute_force = False, False, False
-        grid = Grid(input_grid)
+        return board.version != version
 
-        # If a check is successful, returns the loop to the starting position
-        # in order to "clean up". For instance, after self.identical_possibilities
-        # removes two possibilities from a Square, that Square may be left with
-        # only one possibility left.
-        while not grid.board_full():
+    def xyz_wing(self):
 
-            if grid.initial_checks():
-                initial_checks = True
-                continue
+        '''
+        If there exists a Square with the three possibilities a, b and c, which
+        sees a Square with the possibilities a and c and another with b and c,
+        then one of the three must be c. Remove c from every Square seeing all
+        three, return True. Else, return False.
 
-            elif grid.advanced_checks():
-                advanced_checks = True
-                continue
+        '''
 
-            else:
-                # If both self.initial_checks and self.advanced_checks return False,
-                # a recursive brute force algorithm is used to solve the remainder of
-                # the sudoku.
-                grid.brute_force()
-                brute_force = True
-                for j, square in enumerate(grid.grid_tuple):
-                    square.value = grid.solution[j]
-                continue
-        else:
-            print(
-                f"\
-solved sudoku {i} using {explanation[initial_checks, advanced_checks, brute_force]}."
-            )
-            print(grid)
+        board, layout = self.board, self.layout
+        values, cands = board.values, board.cands
+        popcount, peer_masks = layout.popcount, layout.peer_masks
 
-            if args.out_path:
+        pairs = tuple(
+            cell
+            for cell in range(layout.cells)
+            if values[cell] == 0 and popcount(cands[cell]) == 2
+        )
 
-                with output_path.open("a") as writer:
-                    for square in grid.grid_tuple:
-                        writer.write(str(square.value))
-                    writer.write("\n")
+        version = board.version
+        for pivot in range(layout.cells):
+            if values[pivot] != 0 or popcount(cands[pivot]) != 3:
+                continue
+
+            wings = [
+                cell
+                for cell in pairs
+                if peer_masks[pivot] >> cell & 1 and not cands[cell] & ~cands[pivot]
+            ]
+
+            for first, second in combinations(wings, 2):
+                shared = cands[first] & cands[second]
+
+                if popcount(shared) != 1:
+                    continue
+
+                if cands[first] | cands[second] == cands[pivot]:
+                    self._remove(
+                        shared,
+                        peer_masks[pivot] & peer_masks[first] & peer_masks[second],
+                    )
+
+        return board.version != version
+
+    def simple_coloring(self):
+
+        '''
+        For every possibility, links every pair of Squares which are the only two
+        in some subgrid where it is possible, since exactly one of the two takes
+        it. Each chain of links is coloured in two colours, alternating along the
+        links, so that either every Square of one colour takes the possibility or
+        every Square of the other does. If two Squares of the same colour see
+        each other, that colour cannot take it, so remove it from every Square of
+        that colour. Otherwise, remove it from every Square seeing both colours.
+        Return True if a possibility was removed. Else, return False.
+
+        '''
+
+        board, layout = self.board, self.layout
+        peer_masks = layout.peer_masks
+
+        version = board.version
+        for possibility, positions in enumerate(self._positions()):
+            if not positions:
+                continue
+
+            bit = 1 << (possibility - 1)
+            links = {}
+
+            for subgrid in layout.subgrids:
+                possible_in = [cell for cell in subgrid if positions >> cell & 1]
+
+                if len(possible_in) == 2:
+                    first, second = possible_in
+                    links.setdefault(first, set()).add(second)
+                    links.setdefault(second, set()).add(first)
+
+            coloured = set()
+            for start in links:
+                if start in coloured:
+                    continue
+
+                # Masks of the positions of either colour of this chain.
+                colours = [0, 0]
+                stack = [(start, 0)]
+                coloured.add(start)
+
+                while stack:
+                    cell, colour = stack.pop()
+                    colours[colour] |= 1 << cell
+
+                    for linked in links[cell]:
+                        if linked not in coloured:
+                            coloured.add(linked)
+                            stack.append((linked, 1 - colour))
+
+                for mask in colours:
+                    if any(peer_masks[cell] & mask for cell in _cells(mask)):
+                        self._remove(bit, mask)
+                        break
+
+                else:
+                    trapped = 0
+                    for cell in _cells(positions & ~(colours[0] | colours[1])):
+                        seen = peer_masks[cell]
+                        if seen & colours[0] and seen & colours[1]:
+                            trapped |= 1 << cell
+
+                    self._remove(bit, trapped)
+
+        return board.version != version
+
+    def propagate(self):
+
+        '''
+        Applies the same checks as self.initial_checks and self.advanced_checks
+        until neither can make any more progress, but without starting from the
+        beginning after every change. Squares and subgrids waiting to be checked
+        are kept in queues, and when a check changes a Square, only that Square,
+        the Squares adjacent to it and the subgrids it is a member of are queued
+        again. As in the restarting loop, the checks of self.initial_checks are
+        always exhausted before any check of self.advanced_checks is made, and
+        those before self.expert_checks.
+        Returns a tuple of whether the checks of self.initial_checks and of
+        self.advanced_checks changed anything, as used by _explain.
+        What self.expert_checks changed is counted in self.hits.
+
+        '''
+
+        board = self.board
+        values = board.values
+        size = self.layout.size
+        subgrids, cell_subgrids = self.layout.subgrids, self.layout.cell_subgrids
+
+        square_queue = deque(c for c in range(self.layout.cells) if values[c] == 0)
+        subgrid_queue = deque(range(3 * size))
+        advanced_queue = deque(range(3 * size))
+        in_square_queue = set(square_queue)
+        in_subgrid_queue = set(subgrid_queue)
+        in_advanced_queue = set(advanced_queue)
+
+        def requeue(changes_from):
+            for cell in board.changes[changes_from:]:
+                indices = cell_subgrids[cell * 3 : cell * 3 + 3]
+
+                # A revealed value may eliminate possibilities from every
+                # adjacent Square, otherwise only this Square needs checking.
+                if values[cell] != 0:
+                    adjacent = chain.from_iterable(subgrids[i] for i in indices)
+                else:
+                    adjacent = (cell,)
+
+                for c in adjacent:
+                    if values[c] == 0 and c not in in_square_queue:
+                        in_square_queue.add(c)
+                        square_queue.append(c)
+
+                for i in indices:
+                    if i not in in_subgrid_queue:
+                        in_subgrid_queue.add(i)
+                        subgrid_queue.append(i)
+                    if i not in in_advanced_queue:
+                        in_advanced_queue.add(i)
+                        advanced_queue.append(i)
+
+        initial, advanced = False, False
+        board.changes = []
+
+        while not self.board_full():
+            changes_from = len(board.changes)
+
+            if square_queue:
+                cell = square_queue.popleft()
+                in_square_queue.discard(cell)
+
+                if values[cell] != 0:
+                    continue
+
+                if self.adjacent_elimination(cell) | self.one_possibility(cell):
+                    initial = True
+                    requeue(changes_from)
+
+            elif subgrid_queue:
+                i = subgrid_queue.popleft()
+                in_subgrid_queue.discard(i)
+
+                if self.only_instance(subgrids[i]):
+                    initial = True
+                    requeue(changes_from)
+
+            elif advanced_queue:
+                i = advanced_queue.popleft()
+                in_advanced_queue.discard(i)
+                subgrid = subgrids[i]
+
+                if (
+                    any(self.identical_possibilities(subgrid, j) for j in range(2, 5))
+                    or any(self.unique_possibilities(subgrid, j) for j in range(2, 5))
+                    or self.box_line_intersection(subgrid, i < 2 * size)
+                ):
+                    advanced = True
+                    requeue(changes_from)
+
+            # Only once every queue is empty, as the techniques look at the
+            # whole sudoku rather than at what changed.
+            elif self.expert_checks():
+                requeue(changes_from)
+
+            else:
+                break
+
+        board.changes = None
+        return initial, advanced
+
+    def brute_force(self, limit=1):
+
+        '''
+        Searches for solutions, stopping after limit solutions have been found,
+        and returns the number found. self.solution is assigned the first solution
+        found, or None if there is none. The Squares are left as they were. A
+        sudoku whose starting values contradict each other has no solutions.
+        At every step, the Square with the fewest possibilities is chosen and each
+        of its possibilities is tried in turn. Assigning a value removes it from
+        the possibilities of every adjacent Square, and any Square left with only
+        one possibility is assigned it in turn. Every change is recorded on a
+        trail, so that a failed guess is undone in place rather than by copying
+        the grid. Once no Square is left with one possibility, any possibility
+        left in only one Square of a subgrid is assigned too.
+
+        '''
+
+        board = self.board
+        values, cands = board.values, board.cands
+        layout = self.layout
+        popcount, peers, subgrids = layout.popcount, layout.peers, layout.subgrids
+        peer_count = layout.peer_count
+
+        # Entries are (position, possibilities before the change, whether the
+        # position was also assigned a value).
+        trail = []
+
+        def assign(cell, bit):
+            pending = [(cell, bit)]
+
+            while pending:
+                cell, bit = pending.pop()
+
+                if values[cell] != 0:
+                    if cands[cell] != bit:
+                        return False
+                    continue
+
+                trail.append((cell, cands[cell], True))
+                cands[cell] = bit
+                board.place(cell, bit.bit_length())
+
+                for peer in peers[cell * peer_count : (cell + 1) * peer_count]:
+                    mask = cands[peer]
+
+                    if not mask & bit:
+                        continue
+
+                    if values[peer] != 0:
+                        return False
+
+                    trail.append((peer, mask, False))
+                    mask &= ~bit
+                    cands[peer] = mask
+
+                    if mask == 0:
+                        return False
+
+                    if popcount(mask) == 1:
+                        pending.append((peer, mask))
+
+                if pending:
+                    continue
+
+                for subgrid in subgrids:
+                    seen_once, seen_twice = 0, 0
+                    for cell in subgrid:
+                        seen_twice |= seen_once & cands[cell]
+                        seen_once |= cands[cell]
+
+                    if seen_once != layout.all:
+                        return False
+
+                    only_once = seen_once & ~seen_twice
+                    for cell in subgrid:
+                        if values[cell] == 0 and cands[cell] & only_once:
+                            if popcount(cands[cell] & only_once) > 1:
+                                return False
+                            pending.append((cell, cands[cell] & only_once))
+
+            return True
+
+        def undo(length):
+            while len(trail) > length:
+                cell, mask, placed = trail.pop()
+                if placed:
+                    board.unplace(cell)
+                cands[cell] = mask
+
+        found = 0
+        stats = self.stats
+
+        def search(depth):
+            nonlocal found
+
+            if stats is not None:
+                stats.nodes += 1
+                stats.max_depth = max(stats.max_depth, depth)
+
+            best, best_count = None, layout.size + 1
+            for cell in range(layout.cells):
+                if values[cell] == 0 and popcount(cands[cell]) < best_count:
+                    best, best_count = cell, popcount(cands[cell])
+
+            if best is None:
+                found += 1
+                if self.solution is None:
+                    self.solution = tuple(values)
+                return found >= limit
+
+            for poss in layout.digits(cands[best]):
+                length = len(trail)
+
+                if assign(best, 1 << (poss - 1)) and search(depth + 1):
+                    return True
+
+                undo(length)
+
+            return False
+
+        self.solution = None
+        consistent = not board.duplicated
+
+        for cell in range(layout.cells):
+            if values[cell] == 0:
+                mask = cands[cell] & ~board.revealed(cell)
+
+                if mask != cands[cell]:
+                    trail.append((cell, cands[cell], False))
+                    cands[cell] = mask
+
+                if mask == 0:
+                    consistent = False
+
+        for cell in range(layout.cells):
+            if consistent and values[cell] == 0 and popcount(cands[cell]) == 1:
+                consistent = assign(cell, cands[cell])
+
+        if consistent:
+            search(0)
+
+        undo(0)
+        return found
+
+    def board_full(self):
+        return self.board.empty == 0
+
+    def __str__(self):
+
+        '''
+        Defines the printable string representation.
+
+        '''
+
+        values, size = self.board.values, self.layout.size
+        rows = (
+            "  |  ".join(_CHARS[values[cell]] for cell in subgrid)
+            for subgrid in self.layout.subgrids[:size]
+        )
+        line = "|".join(["-----"] * size)
+        return "\n\n\t       " + f"  \n\t\t{line}\n\t\t  ".join(rows) + "  \n\n"
+
+
+class Square:
+
+    __slots__ = ("row", "col", "cell", "board", "box")
+
+    def __init__(self, col, row, board):
+
+        '''
+        Uses row, col to determine self.row, self.col, self.box and self.cell, the
+        index of the Square in board. self.value and self.poss are read from and
+        written to board.
+
+        '''
+
+        self.row = row
+        self.col = col
+        self.cell = row * board.layout.size + col
+        self.board = board
+        self.box = board.layout.box_of[self.cell]
+
+    @property
+    def value(self):
+        return self.board.values[self.cell]
+
+    @value.setter
+    def value(self, value):
+        if self.board.values[self.cell] != 0:
+            self.board.unplace(self.cell)
+        if value != 0:
+            self.board.place(self.cell, value)
+
+    @property
+    def poss(self):
+        return list(self.board.layout.digits(self.board.cands[self.cell]))
+
+    @poss.setter
+    def poss(self, poss):
+        self.board.set_cands(self.cell, sum(1 << (p - 1) for p in set(poss)))
+
+
+def _timed(timings, name, method, *args):
+
+    '''
+    Returns method(*args). If timings is a dict, the time taken is also added to
+    timings[name].
+
+    '''
+
+    if timings is None:
+        return method(*args)
+
+    start = time.perf_counter()
+    try:
+        return method(*args)
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+
+def solve(
+    input_grid,
+    incremental=False,
+    engine="grid",
+    timings=None,
+    stats=None,
+    cache=None,
+    techniques=(),
+):
+
+    '''
+    Solves input_grid, returning the solved Grid along with a tuple of whether
+    initial_checks, advanced_checks and brute_force were required, as taken by
+    _explain. If incremental is True, Grid.propagate is used in place of
+    restarting Grid.initial_checks and Grid.advanced_checks after every change.
+    If engine is "dlx", the sudoku is instead solved as an exact cover problem by
+    dlx.solve, and None is returned in place of the tuple. If engine is "batch",
+    it is solved by batch.solve, and the tuple says whether box line
+    intersection, rather than advanced_checks, was required.
+    If timings is a dict, the time spent in each of these methods is added to
+    it, keyed by the name of the method. If stats is a Stats object, it is
+    given to the Grid to count its methods.
+    If cache is a cache.SolutionCache, it is checked first for the solution to
+    input_grid or any sudoku equivalent to it, and is given the solution if not.
+    techniques is given to the Grid, for Grid.expert_checks to try after
+    advanced_checks, what they changed being counted in the hits of the Grid
+    returned. The cache and the other engines do not use them.
+    Raises ValueError if input_grid has no solution.
+
+    '''
+
+    if cache is not None:
+        cached = cache.get(input_grid)
+        if cached is not None:
+            solution, levels = cached
+            return Grid(solution), levels
+
+        grid, levels = solve(
+            input_grid, incremental, engine, timings, stats, techniques=techniques
+        )
+        cache.put(input_grid, tuple(grid.board.values), levels)
+        return grid, levels
+
+    if engine == "dlx":
+        import dlx
+
+        solutions = _timed(timings, "dlx", dlx.solve, input_grid)
+        if not solutions:
+            raise ValueError("sudoku has no solution")
+        return Grid(solutions[0]), None
+
+    if engine == "batch":
+        solved = _timed(timings, "batch", _solve_batch, [input_grid])[0]
+        if solved is None:
+            raise ValueError("sudoku has no solution")
+        return solved
+
+    # Before attempting to solve the sudoku, no checking has occurred,
+    # so all the below values are False. If one of the below is ever
+    # successful in removing a possibility from a Square, determining
+    # a value, or finishing the solution, the appropriate variable is
+    # set to True.
+    initial_checks, advanced_checks, brute_force = False, False, False
+    grid = Grid(input_grid, stats, techniques)
+
+    # Starting values which contradict each other are rejected before any
+    # check can fill the rest of the sudoku in around them.
+    if grid.board.duplicated:
+        raise ValueError("sudoku has no solution")
+
+    if incremental:
+        initial_checks, advanced_checks = _timed(timings, "propagate", grid.propagate)
+
+    # If a check is successful, returns the loop to the starting position
+    # in order to "clean up". For instance, after self.identical_possibilities
+    # removes two possibilities from a Square, that Square may be left with
+    # only one possibility left.
+    while not grid.board_full():
+
+        if not incremental and _timed(timings, "initial_checks", grid.initial_checks):
+            initial_checks = True
+            continue
+
+        elif not incremental and _timed(
+            timings, "advanced_checks", grid.advanced_checks
+        ):
+            advanced_checks = True
+            continue
+
+        elif (
+            not incremental
+            and grid.techniques
+            and _timed(timings, "expert_checks", grid.expert_checks)
+        ):
+            continue
+
+        else:
+            # If both self.initial_checks and self.advanced_checks return False,
+            # a recursive brute force algorithm is used to solve the remainder of
+            # the sudoku.
+            if not _timed(timings, "brute_force", grid.brute_force):
+                raise ValueError("sudoku has no solution")
+            brute_force = True
+            for cell, value in enumerate(grid.solution):
+                if grid.board.values[cell] == 0:
+                    grid.board.place(cell, value)
+            continue
+
+    return grid, (initial_checks, advanced_checks, brute_force)
+
+
+def _solve_batch(input_grids, cache=None):
+
+    '''
+    Solves every input grid in input_grids at once with batch.solve, returning a
+    list with, for each, None if it has no solution, otherwise the solved Grid
+    along with the levels of checking required. cache is used as by solve, only
+    sudokus it has no solution for being solved.
+
+    '''
+
+    # Only imported here, so that numpy is only needed for --engine batch.
+    import batch
+
+    results = [None] * len(input_grids)
+    if cache is not None:
+        results = [cache.get(input_grid) for input_grid in input_grids]
+
+    unsolved = [i for i, result in enumerate(results) if result is None]
+    solved = batch.solve([input_grids[i] for i in unsolved])
+
+    for i, result in zip(unsolved, solved):
+        results[i] = result
+        if result is not None and cache is not None:
+            cache.put(input_grids[i], *result)
+
+    return [
+        None if result is None else (Grid(result[0]), result[1]) for result in results
+    ]
+
+
+def count_solutions(input_grid, limit=2, engine="grid", stats=None):
+
+    '''
+    Returns the number of solutions input_grid has, stopping as soon as limit
+    have been found, so a sudoku with one solution has been checked to be unique
+    once limit is 2. Starting values which contradict each other give 0 without
+    any searching. If engine is "dlx", solutions are counted by dlx.solve,
+    otherwise by Grid.brute_force, with stats given to the Grid as in solve.
+
+    '''
+
+    if engine == "dlx":
+        import dlx
+
+        return len(dlx.solve(input_grid, limit))
+
+    grid = Grid(input_grid, stats)
+    if grid.board.duplicated:
+        return 0
+
+    return grid.brute_force(limit)
+
+
+def _describe_count(count, limit):
+    if count == 0:
+        return "no solution"
+    if count == limit:
+        return f"at least {count} solution" + ("s" if count > 1 else "")
+    return f"exactly {count} solution" + ("s" if count > 1 else "")
+
+
+def _tier(levels, hits):
+
+    '''
+    Returns the name of the last tier of checking levels and hits, as given by
+    solve, needed, dancing_links if levels is None, or None if no checks were
+    needed at all.
+
+    '''
+
+    if levels is None:
+        return "dancing_links"
+    if levels[2]:
+        return "brute_force"
+    if hits:
+        return "expert_checks"
+    if levels[1]:
+        return "advanced_checks"
+    return "initial_checks" if levels[0] else None
+
+
+def _format_result(i, result, count_limit, mode):
+
+    '''
+    Returns the text reporting result, as given by _solve_chunk for sudoku i, in
+    mode, one of _OUTPUT_MODES: pretty, the explanation and the printable string
+    of the solved Grid, compact, only its values as a line of a .sdk file, jsonl,
+    a line of JSON holding its values, tier, techniques and the milliseconds
+    taken to solve it, or none, nothing. Sudokus which are not valid or have no
+    solution are reported in every mode. If count_limit is given, result is the
+    number of solutions found instead.
+
+    '''
+
+    if mode == "jsonl":
+        import json
+
+    if result is None or isinstance(result, str):
+        message = result or f"Sudoku {i} has no solution."
+        if mode == "jsonl":
+            return json.dumps({"sudoku": i, "error": message}) + "\n"
+        return message + "\n"
+
+    if mode == "none":
+        return ""
+
+    if count_limit is not None:
+        if mode == "pretty":
+            return f"sudoku {i} has {_describe_count(result, count_limit)}.\n"
+        if mode == "compact":
+            return f"{result}+\n" if result == count_limit else f"{result}\n"
+        record = {"sudoku": i, "solutions": result, "stopped": result == count_limit}
+        return json.dumps(record) + "\n"
+
+    levels, grid_string, solved_string, hits, seconds = result
+
+    if mode == "pretty":
+        return f"solved sudoku {i} using {_explain(levels, hits)}.\n{grid_string}\n"
+    if mode == "compact":
+        return solved_string + "\n"
+
+    record = {
+        "sudoku": i,
+        "solution": solved_string,
+        "tier": _tier(levels, hits),
+        "techniques": hits,
+        "ms": round(seconds * 1000, 3),
+    }
+    return json.dumps(record) + "\n"
+
+
+class _Writer:
+    def __init__(self, stream, flush_interval=0.5):
+
+        '''
+        Collects text written to it, and writes it to stream all at once when
+        flush_interval seconds have passed since stream was last written to, or
+        when self.flush is called, so that printing many short lines costs one
+        write rather than one for every line. A flush_interval of 0 writes
+        everything straight away.
+
+        '''
+
+        self.stream = stream
+        self.flush_interval = flush_interval
+        self.parts = []
+        self.flushed = time.perf_counter()
+
+    def write(self, text):
+        self.parts.append(text)
+        if time.perf_counter() - self.flushed >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self.parts:
+            self.stream.write("".join(self.parts))
+            self.parts.clear()
+        self.stream.flush()
+        self.flushed = time.perf_counter()
+
+
+@lru_cache(maxsize=None)
+def _open_cache(size, path):
+
+    '''
+    Returns the cache.SolutionCache of this process for size and path, opening it
+    the first time it is asked for.
+
+    '''
+
+    import cache
+
+    return cache.SolutionCache(size, path)
+
+
+def _solve_chunk(
+    chunk,
+    incremental=False,
+    engine="grid",
+    stats=False,
+    cache_options=None,
+    count_limit=None,
+    techniques=(),
+    pretty=True,
+):
+
+    '''
+    Solves every input grid in chunk with solve, or all together with
+    _solve_batch if engine is "batch". For each, gives None if it has no
+    solution, otherwise a tuple of the levels of checking required, the
+    printable string of the solved Grid, or None if pretty is False, its values
+    as a line of a .sdk file, the hits of the expert techniques given by
+    techniques and the seconds taken to solve it, which with engine "batch" is
+    an equal share of the time taken by the whole chunk. Messages from
+    _parse_line found in place of an input grid are given back unchanged.
+    Only strings, tuples, dicts and Stats are given back, so that chunks can be
+    solved in worker processes cheaply.
+    Returns a list of these results, along with a Stats object totalling the
+    chunk if stats is True, or None.
+    If cache_options is given, it is the size and path of a cache.SolutionCache
+    which solve uses, one for every process. The hits and misses of the cache
+    while solving the chunk are returned too.
+    If count_limit is given, the solutions of every input grid are counted with
+    count_solutions instead, stopping at count_limit, and the number found is
+    given in place of the tuple.
+
+    '''
+
+    results = []
+    stats = Stats() if stats else None
+    solution_cache = _open_cache(*cache_options) if cache_options else None
+
+    if solution_cache is not None:
+        hits, misses = solution_cache.hits, solution_cache.misses
+
+    if engine == "batch" and count_limit is None:
+        input_grids = [
+            input_grid for input_grid in chunk if not isinstance(input_grid, str)
+        ]
+        start = time.perf_counter()
+        batched = iter(_solve_batch(input_grids, solution_cache))
+        seconds = (time.perf_counter() - start) / max(len(input_grids), 1)
+
+    for input_grid in chunk:
+        if isinstance(input_grid, str):
+            results.append(input_grid)
+            continue
+
+        if count_limit is not None:
+            results.append(count_solutions(input_grid, count_limit, engine, stats))
+            continue
+
+        if engine == "batch":
+            solved = next(batched)
+            if solved is None:
+                results.append(None)
+                continue
+            grid, levels = solved
+
+        else:
+            start = time.perf_counter()
+            try:
+                grid, levels = solve(
+                    input_grid,
+                    incremental,
+                    engine,
+                    stats=stats,
+                    cache=solution_cache,
+                    techniques=techniques,
+                )
+            except ValueError:
+                results.append(None)
+                continue
+            seconds = time.perf_counter() - start
+
+        solved_string = "".join(_CHARS[value] for value in grid.board.values)
+        grid_string = str(grid) if pretty else None
+        results.append((levels, grid_string, solved_string, grid.hits, seconds))
+
+    if solution_cache is not None:
+        hits = solution_cache.hits - hits
+        misses = solution_cache.misses - misses
+        return results, stats, (hits, misses)
+
+    return results, stats, None
+
+
+def _solve_records(path, solve_chunk, bounds):
+
+    '''
+    Solves sudokus start to stop, given as bounds, of the .sdb file at path with
+    solve_chunk, as _solve_chunk. Values too large for the size of sudoku, which
+    only a damaged file has, give the same message as from _parse_line.
+
+    '''
+
+    # Only imported here, as packed imports this module.
+    import packed
+
+    reader = packed.open_shared(path)
+    chunk = []
+
+    for i in range(*bounds):
+        input_grid = reader[i]
+        if max(input_grid) > reader.size:
+            input_grid = f"Sudoku {i} has values above {reader.size}."
+        chunk.append(input_grid)
+
+    return solve_chunk(chunk)
+
+
+def _read_lines(reader, offsets, offset=0, start=0):
+
+    '''
+    Yields the number and text of every line of reader, a .sdk file opened as
+    bytes at offset, where line start begins. The offset just after every line
+    is appended to offsets as it is read. Lines are decoded as a file read as
+    text would give them.
+
+    '''
+
+    for i, line in enumerate(reader, start):
+        offset += len(line)
+        offsets.append(offset)
+        yield i, line.decode().replace("\r\n", "\n")
+
+
+def _write_checkpoint(path, writer, progress):
+
+    '''
+    Makes everything written to writer durable, then records progress, a dict
+    of the input path, the offset into it and the number of sudokus done, along
+    with the length of the output, in the checkpoint file at path. The file is
+    replaced in one step, so a run stopped at any point leaves a checkpoint
+    whose output is at least as long as it says.
+
+    '''
+
+    import json
+
+    writer.flush()
+    os.fsync(writer.fileno())
+
+    temporary = path + ".tmp"
+    with open(temporary, "w") as checkpoint:
+        json.dump(dict(progress, out_size=writer.tell()), checkpoint)
+        checkpoint.flush()
+        os.fsync(checkpoint.fileno())
+
+    os.replace(temporary, path)
+
+
+def _read_checkpoint(path, input_path, output_path):
+
+    '''
+    Returns the dict recorded by _write_checkpoint at path. Raises ValueError
+    if there is none, or it is for another input, or the output is shorter than
+    it says.
+
+    '''
+
+    import json
+
+    try:
+        with open(path) as checkpoint:
+            progress = json.load(checkpoint)
+    except (OSError, ValueError):
+        raise ValueError(f"There is no checkpoint to resume from at {path}.")
+
+    if progress["in_path"] != os.path.realpath(input_path):
+        raise ValueError(f"The checkpoint is for {progress['in_path']}.")
+
+    if not os.path.exists(output_path):
+        raise ValueError("The output file is missing.")
+
+    if os.path.getsize(output_path) < progress["out_size"]:
+        raise ValueError("The output file is shorter than the checkpoint says.")
+
+    return progress
+
+
+def _parse_techniques(names):
+
+    '''
+    Returns the techniques named in names, separated by commas, as a tuple in
+    the same order, or every one of Grid.TECHNIQUES if names is all. Raises
+    ValueError for a name which is not one of them.
+
+    '''
+
+    if names == "all":
+        return Grid.TECHNIQUES
+
+    techniques = tuple(name.strip() for name in names.split(",") if name.strip())
+    for name in techniques:
+        if name not in Grid.TECHNIQUES:
+            raise ValueError(f"{name} is not one of {', '.join(Grid.TECHNIQUES)}.")
+
+    return techniques
+
+
+def _parse_line(i, input_string):
+
+    '''
+    Returns the input grid in input_string, line i of a .sdk file, as a tuple of
+    ints, or if it is not valid, a message saying why. A line of 81 characters
+    is a 9x9 sudoku, 256 a 16x16 sudoku and 625 a 25x25 sudoku. Values above 9
+    are written as letters, A being 10, in either case.
+
+    '''
+
+    input_grid = tuple(char for char in input_string.upper() if char != "\n")
+
+    if any(char not in _CHARS for char in input_grid):
+        return f"Not all characters in sudoku {i} are integers or letters A to P."
+
+    elif len(input_grid) not in _SIZES:
+        return f"Sudoku {i} does not have 81, 256 or 625 characters."
+
+    input_grid = tuple(_CHARS.index(char) for char in input_grid)
+
+    if max(input_grid) > _SIZES[len(input_grid)]:
+        return f"Sudoku {i} has values above {_SIZES[len(input_grid)]}."
+
+    return input_grid
+
+
+def _chunked(iterable, size):
+
+    '''
+    Yields lists of the next size items of iterable, reading no further ahead.
+
+    '''
+
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+def _imap_bounded(pool, func, iterable, window):
+
+    '''
+    Like pool.imap, giving back func of every item of iterable in order, but only
+    takes the next item once fewer than window items are being worked on. Unlike
+    pool.imap, iterable is never read far ahead of the results.
+
+    '''
+
+    pending = deque()
+
+    for item in iterable:
+        pending.append(pool.apply_async(func, (item,)))
+
+        if len(pending) >= window:
+            yield pending.popleft().get()
+
+    while pending:
+        yield pending.popleft().get()
+
+
+# The value of every argument of main which is not given, for both _fast_args
+# and _parse_args.
+_DEFAULTS = {
+    "in_path": None,
+    "out_path": None,
+    "output_mode": _OUTPUT_MODES[0],
+    "quiet": False,
+    "flush_interval": 0.5,
+    "incremental": False,
+    "engine": "grid",
+    "workers": 1,
+    "chunk_size": 64,
+    "skip_invalid": False,
+    "stats": False,
+    "count_solutions": None,
+    "check_unique": False,
+    "cache": 0,
+    "cache_file": None,
+    "techniques": "",
+    "checkpoint": None,
+    "resume": False,
+}
+
+
+class _Arguments:
+    def __init__(self, **options):
+        self.__dict__.update(options)
+
+
+def _fast_args(argv):
+
+    '''
+    Returns the arguments in argv as _parse_args would, if they are only the
+    paths and --quiet, as in most runs, without importing argparse, which takes
+    a large part of the time to solve a single sudoku. Otherwise returns None,
+    and they are left to _parse_args.
+
+    '''
+
+    places = [i for i, arg in enumerate(argv) if arg not in ("--quiet", "-q")]
+    paths = [argv[i] for i in places]
+    if len(paths) > 2 or any(arg.startswith("-") and arg != "-" for arg in paths):
+        return None
+
+    # argparse only takes both paths together, not either side of --quiet.
+    if len(places) == 2 and places[1] != places[0] + 1:
+        return None
+
+    paths += [None] * (2 - len(paths))
+    options = dict(_DEFAULTS, in_path=paths[0], out_path=paths[1])
+    options["quiet"] = len(places) < len(argv)
+    return _Arguments(**options)
+
+
+def _parse_args(parser, args=None):
+
+    parser.add_argument(
+        "in_path",
+        help="A valid path to a .sdk or .sdb file containing the unsolved grids, "
+        "or - to read them from stdin.",
+        nargs="?",
+    )
+    parser.add_argument(
+        "out_path",
+        help="A valid path to a .sdk file containing the solved grids, or - to "
+        "write them to stdout, everything else printed going to stderr.",
+        nargs="?",
+    )
+    parser.add_argument(
+        "--output-mode",
+        help="Report every sudoku with its explanation and solved grid, as a "
+        "line of its values, as a line of JSON with its values, tier and time, "
+        "or not at all. Sudokus which are not valid or have no solution are "
+        "reported in every mode.",
+        choices=_OUTPUT_MODES,
+    )
+    parser.add_argument(
+        "--quiet",
+        "-q",
+        help="The same as --output-mode none.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--flush-interval",
+        help="Write what is reported at most once every this many seconds, "
+        "collecting it in between, or straight away with 0.",
+        type=float,
+    )
+    parser.add_argument(
+        "--incremental",
+        help="Propagate changes through a work queue instead of restarting the "
+        "checks from the beginning after every change.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--engine",
+        help="Solve with the checks of Grid followed by Grid.brute_force, as an "
+        "exact cover problem with dancing links, or a chunk at a time with NumPy.",
+        choices=("grid", "dlx", "batch"),
+    )
+    parser.add_argument(
+        "--workers",
+        help="The number of processes to solve the sudokus in. Results are "
+        "reported in the same order either way.",
+        type=int,
+    )
+    parser.add_argument(
+        "--chunk-size",
+        help="The number of sudokus sent to a worker process, or solved together "
+        "by --engine batch, at a time.",
+        type=int,
+    )
+    parser.add_argument(
+        "--skip-invalid",
+        help="Report sudokus which are not valid or have no solution, writing "
+        "invalid in place of their solution, and carry on with the next, instead "
+        "of stopping.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--stats",
+        help="Count how often each check changed something, the possibilities it "
+        "removed and the time spent in it, and print the totals at the end.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--count-solutions",
+        help="Count the solutions of every sudoku, stopping once this many have "
+        "been found, instead of solving it. The number found is written to the "
+        "output file, followed by + if counting stopped there.",
+        type=int,
+    )
+    parser.add_argument(
+        "--check-unique",
+        help="The same as --count-solutions 2: whether every sudoku has no "
+        "solution, exactly one, or more than one.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--cache",
+        help="Remember the solutions of up to this many sudokus, so that repeated "
+        "sudokus, or sudokus equivalent to them, are not solved again.",
+        type=int,
+    )
+    parser.add_argument(
+        "--cache-file",
+        help="A path to a sqlite database which keeps every solution remembered "
+        "between runs. Remembers up to 4096 in memory unless --cache is given.",
+    )
+    parser.add_argument(
+        "--techniques",
+        help="Expert techniques to try, in this order, when advanced_checks can do "
+        "no more, before brute_force, separated by commas, or all for every one: "
+        + ", ".join(Grid.TECHNIQUES)
+        + ".",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        help="Every this many sudokus, make the output file durable and record "
+        "how far through the input the run is, so that --resume can carry on.",
+        type=int,
+    )
+    parser.add_argument(
+        "--resume",
+        help="Carry on a run which was stopped, from its last checkpoint, "
+        "appending to its output file. Checkpoints every 1000 sudokus unless "
+        "--checkpoint is given.",
+        action="store_true",
+    )
+    parser.set_defaults(**_DEFAULTS)
+    return parser.parse_args(args)
+
+
+def main():
+
+    args = _fast_args(sys.argv[1:])
+    if args is None:
+        import argparse
+
+        args = _parse_args(argparse.ArgumentParser())
+
+    # Paths are kept as strings, and checked with os.path, as importing pathlib
+    # alone takes a noticeable part of the time to solve a single sudoku.
+    input_path, output_path = args.in_path, args.out_path
+
+    if input_path == "-":
+        pass
+    elif input_path:
+        if not os.path.exists(input_path):
+            print("Not a valid input path")
+            sys.exit(1)
+        if os.path.splitext(input_path)[1] not in (".sdk", ".sdb"):
+            print("Input is not a .sdk or .sdb file.")
+            sys.exit(1)
+    else:
+        print("Please enter a valid path containing the unsolved sudokus.")
+        sys.exit(1)
+
+    checkpoint = None
+    if args.checkpoint is not None or args.resume:
+        if output_path in (None, "-") or input_path == "-":
+            print("--checkpoint and --resume need input and output files.")
+            sys.exit(1)
+        if args.checkpoint is not None and args.checkpoint < 1:
+            print("--checkpoint must be at least 1.")
+            sys.exit(1)
+        checkpoint = args.checkpoint or 1000
+
+    if output_path and output_path != "-":
+        checkpoint_path = output_path + ".checkpoint"
+        if os.path.exists(output_path) and not args.resume:
+            print("This file already exists")
+            sys.exit(1)
+        if not os.path.splitext(output_path)[1] == ".sdk":
+            print("Output is not a .sdk file.")
+            sys.exit(1)
+
+    # A run is resumed from the state its last checkpoint recorded, the output
+    # being cut back to the length it had then, so no line is written twice.
+    progress = {"in_path": os.path.realpath(input_path), "offset": 0, "done": 0}
+    if args.resume:
+        try:
+            progress = _read_checkpoint(checkpoint_path, input_path, output_path)
+        except ValueError as error:
+            print(error)
+            sys.exit(1)
+        os.truncate(output_path, progress.pop("out_size"))
+        print(f"resuming from sudoku {progress['done']}")
+
+    if args.workers < 1 or args.chunk_size < 1:
+        print("--workers and --chunk-size must be at least 1.")
+        sys.exit(1)
+
+    count_limit = 2 if args.check_unique else args.count_solutions
+    if count_limit is not None and count_limit < 1:
+        print("--count-solutions must be at least 1.")
+        sys.exit(1)
+
+    if args.engine == "batch" and count_limit is None:
+        try:
+            import batch
+        except ImportError:
+            print("--engine batch needs numpy to be installed.")
+            sys.exit(1)
+
+    cache_options = None
+    if args.cache > 0 or args.cache_file:
+        cache_options = (args.cache or 4096, args.cache_file)
+
+    try:
+        techniques = _parse_techniques(args.techniques)
+    except ValueError as error:
+        print(error)
+        sys.exit(1)
+
+    if args.flush_interval < 0:
+        print("--flush-interval must be at least 0.")
+        sys.exit(1)
+
+    output_mode = "none" if args.quiet else args.output_mode
+
+    solve_chunk = partial(
+        _solve_chunk,
+        incremental=args.incremental,
+        engine=args.engine,
+        stats=args.stats,
+        cache_options=cache_options,
+        count_limit=count_limit,
+        techniques=techniques,
+        pretty=output_mode == "pretty",
+    )
+    stats = Stats()
+
+    # When solutions are written to stdout, everything else goes to stderr, so
+    # that stdout can be read as a .sdk file. Both are written through a
+    # _Writer, as writing every line as it comes can take longer than solving.
+    report = _Writer(
+        sys.stderr if output_path == "-" else sys.stdout, args.flush_interval
+    )
+    cache_hits, cache_misses = 0, 0
+
+    # Sudokus are read, solved and written one chunk at a time, so that results
+    # appear straight away and memory use does not grow with the input. One at
+    # a time is quickest to the first result when there are no workers to share
+    # them between, unless the chunk is solved all together.
+    chunk_size = args.chunk_size if args.workers > 1 or args.engine == "batch" else 1
+
+    with contextlib.ExitStack() as stack:
+        # Whatever is left is written however the run ends, even by sys.exit.
+        stack.callback(report.flush)
+
+        if output_path == "-":
+            writer = _Writer(sys.stdout, args.flush_interval)
+            stack.callback(writer.flush)
+        elif output_path:
+            writer = stack.enter_context(open(output_path, "a" if args.resume else "w"))
+
+        # Only the bounds of every chunk of a .sdb file are sent out, each
+        # process reading the sudokus from its own map of the file.
+        if input_path == "-":
+            grids = (_parse_line(i, line) for i, line in enumerate(sys.stdin))
+            chunks = _chunked(grids, chunk_size)
+
+        elif input_path.endswith(".sdb"):
+            import packed
+
+            try:
+                count = len(packed.open_shared(input_path))
+            except ValueError as error:
+                print(error)
+                sys.exit(1)
+
+            chunks = (
+                (start, min(start + chunk_size, count))
+                for start in range(progress["done"], count, chunk_size)
+            )
+            solve_chunk = partial(_solve_records, input_path, solve_chunk)
+            offsets = None
+
+        # Checkpointing needs the offset of every line, which a file read as
+        # text is slow to give, so the input is read as bytes instead.
+        elif checkpoint is not None:
+            reader = stack.enter_context(open(input_path, "rb"))
+            reader.seek(progress["offset"])
+            offsets = deque()
+            lines = _read_lines(reader, offsets, progress["offset"], progress["done"])
+            grids = (_parse_line(i, line) for i, line in lines)
+            chunks = _chunked(grids, chunk_size)
+
+        else:
+            reader = stack.enter_context(open(input_path, "r"))
+            grids = (_parse_line(i, line) for i, line in enumerate(reader))
+            chunks = _chunked(grids, chunk_size)
+
+        # Results come back in the order the chunks were sent, so they are in
+        # the same order as when solving one at a time.
+        if args.workers > 1:
+            import multiprocessing
+
+            pool = stack.enter_context(multiprocessing.Pool(args.workers))
+            results = _imap_bounded(pool, solve_chunk, chunks, 4 * args.workers)
+        else:
+            results = map(solve_chunk, chunks)
+
+        i = progress["done"]
+
+        for chunk_results, chunk_stats, cache_counts in results:
+
+            if chunk_stats is not None:
+                stats.merge(chunk_stats)
+
+            if cache_counts is not None:
+                cache_hits += cache_counts[0]
+                cache_misses += cache_counts[1]
+
+            for result in chunk_results:
+
+                report.write(_format_result(i, result, count_limit, output_mode))
+
+                if result is None or isinstance(result, str):
+                    if not args.skip_invalid:
+                        sys.exit(1)
+
+                    # A line is written for every sudoku, so that the output
+                    # lines up with the input.
+                    if args.out_path:
+                        writer.write("invalid\n")
+
+                elif count_limit is not None:
+                    if args.out_path:
+                        writer.write(str(result))
+                        writer.write("+\n" if result == count_limit else "\n")
+
+                elif args.out_path:
+                    solved_string = result[2]
+                    writer.write(solved_string)
+                    writer.write("\n")
+
+                i += 1
+
+                if checkpoint is not None:
+                    progress["done"] = i
+                    progress["offset"] = i if offsets is None else offsets.popleft()
+                    if i % checkpoint == 0:
+                        _write_checkpoint(checkpoint_path, writer, progress)
+
+    # A finished run has nothing to resume.
+    if checkpoint is not None and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    if args.stats:
+        print(stats, file=report)
+
+    if cache_options:
+        print(f"cache hits {cache_hits}, misses {cache_misses}", file=report)
+
+    report.flush()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,46 @@
+import pathlib, random, time
+
+import cache, canon, generate, sudoku
+
+SAMPLE = pathlib.Path(sudoku.__file__).with_name("sample_sudoku.sdk")
+
+
+def test_solved_16x16_is_not_canonicalized():
+    grid = generate.full_grid(random.Random(1), 16)
+
+    start = time.perf_counter()
+    results, _, counts = sudoku._solve_chunk([grid, grid], cache_options=(10, None))
+
+    assert time.perf_counter() - start < 5
+    assert [sudoku._parse_line(0, result[2]) for result in results] == [grid, grid]
+    assert counts == (0, 2)
+
+
+def test_equivalent_sudoku_is_found():
+    grid = sudoku._parse_line(0, SAMPLE.read_text().splitlines()[0])
+    solution_cache = cache.SolutionCache(10)
+
+    solution, levels = sudoku.solve(grid, cache=solution_cache)
+    found = solution_cache.get(canon._transposed(grid))
+
+    assert found == (canon._transposed(solution.board.values), levels)
+
+
+def test_sparse_25x25(tmp_path):
+    rng = random.Random(3)
+    solution = generate.full_grid(rng, 25)
+    given = set(rng.sample(range(625), 20))
+    grid = tuple(value if cell in given else 0 for cell, value in enumerate(solution))
+    levels = (True, False, True)
+
+    start = time.perf_counter()
+    solution_cache = cache.SolutionCache(10, tmp_path / "cache.db")
+    solution_cache.put(grid, solution, levels)
+    solution_cache.close()
+
+    # Only the database remembers it now.
+    solution_cache = cache.SolutionCache(10, tmp_path / "cache.db")
+    found = solution_cache.get(canon._transposed(grid))
+
+    assert time.perf_counter() - start < 5
+    assert found == (canon._transposed(solution), levels)
@@ -0,0 +1,33 @@
+import random, subprocess, sys, time
+
+import canon, dedup, generate, sudoku
+
+
+def _line(grid):
+    return "".join(sudoku._CHARS[value] for value in grid)
+
+
+def test_equivalent_sudokus_share_a_key():
+    grid = generate.generate(random.Random(1))[0]
+    assert dedup._key(grid) == dedup._key(canon._transposed(grid))
+
+
+def test_dense_16x16(tmp_path):
+    rng = random.Random(2)
+    full = generate.full_grid(rng, 16)
+    dense = tuple(0 if cell < 3 else value for cell, value in enumerate(full))
+    lines = [_line(full), _line(dense), _line(full), _line(canon._transposed(full))]
+
+    in_path, out_path = tmp_path / "in.sdk", tmp_path / "out.sdk"
+    in_path.write_text("".join(line + "\n" for line in lines))
+
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, dedup.__file__, str(in_path), str(out_path)],
+        check=True,
+        capture_output=True,
+    )
+
+    assert time.perf_counter() - start < 10
+    assert out_path.read_text().splitlines() == [lines[0], lines[1], lines[3]]
+    assert out_path.with_suffix(".map").read_text().split() == ["0", "1", "0", "2"]
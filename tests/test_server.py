@@ -0,0 +1,85 @@
+from functools import partial
+import json, socket, threading, urllib.request
+
+import pytest
+
+import server, sudoku
+
+LINES = [
+    "0" * 81,
+    "639251748458637192712948365394825617175369824826714953"
+    "981472536267593481543186279",
+]
+
+
+@pytest.fixture
+def options():
+    metrics = server.Metrics()
+    solve_chunk = partial(sudoku._solve_chunk, pretty=False)
+    batcher = server.Batcher(solve_chunk, 1, 8, 0.001, metrics)
+    yield {"batcher": batcher, "metrics": metrics}
+    batcher.close()
+
+
+@pytest.fixture
+def http(options):
+    handler = type("HTTPHandler", (server._HTTPHandler,), options)
+    instance = server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=instance.serve_forever, daemon=True).start()
+    yield instance.server_port
+    instance.shutdown()
+    instance.server_close()
+
+
+def test_http_any_levels(http):
+    for line in LINES:
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{http}/solve",
+            data=json.dumps({"sudoku": line}).encode(),
+        )
+        with urllib.request.urlopen(request, timeout=10) as response:
+            reply = json.load(response)
+        assert "error" not in reply
+        assert reply["explanation"] == sudoku._explain(tuple(reply["levels"].values()))
+
+
+def test_unix_any_levels(options, tmp_path):
+    path = str(tmp_path / "sudoku.sock")
+    handler = type("UnixHandler", (server._UnixHandler,), options)
+    unix = server._UnixServer(path, handler)
+    threading.Thread(target=unix.serve_forever, daemon=True).start()
+
+    try:
+        with socket.socket(socket.AF_UNIX) as client:
+            client.settimeout(10)
+            client.connect(path)
+            client.sendall("".join(line + "\n" for line in LINES).encode())
+            replies = client.makefile()
+            for _ in LINES:
+                reply = json.loads(replies.readline())
+                assert "error" not in reply
+                assert reply["explanation"]
+    finally:
+        unix.shutdown()
+        unix.server_close()
+
+
+@pytest.mark.parametrize("length", ["ten", "-5"])
+def test_http_bad_content_length(options, http, length):
+    with socket.create_connection(("127.0.0.1", http), 10) as client:
+        client.sendall(
+            f"POST /solve HTTP/1.0\r\nContent-Length: {length}\r\n\r\n".encode()
+        )
+        status = client.makefile("rb").readline().split()[1]
+
+    assert status == b"400"
+    assert options["metrics"].requests == 0
+
+
+def test_metrics_counted_once_replied(options):
+    metrics = options["metrics"]
+    results, failed = server._solve_lines(options["batcher"], metrics, LINES)
+
+    assert not failed and all("solution" in result for result in results)
+    assert metrics.as_dict()["solved"] == len(LINES)
+    assert len(metrics.latencies) == len(LINES)
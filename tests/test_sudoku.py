@@ -0,0 +1,98 @@
+import argparse, json, subprocess, sys
+
+import pytest
+
+import sudoku
+
+SOLVED = (
+    "639251748458637192712948365394825617175369824826714953"
+    "981472536267593481543186279"
+)
+
+
+def _solve(line):
+    results = sudoku._solve_chunk([sudoku._parse_line(0, line)])[0]
+    return results[0]
+
+
+@pytest.mark.parametrize("mode", sudoku._OUTPUT_MODES)
+@pytest.mark.parametrize("line", ["0" * 81, SOLVED])
+def test_format_result_any_levels(line, mode):
+    result = _solve(line)
+    text = sudoku._format_result(0, result, None, mode)
+
+    if mode == "pretty":
+        assert text.startswith("solved sudoku 0 using ")
+    elif mode == "compact":
+        assert text == result[2] + "\n"
+    elif mode == "jsonl":
+        assert json.loads(text)["solution"] == result[2]
+
+
+def test_explain_no_checks():
+    assert _solve(SOLVED)[0] == (False, False, False)
+    assert sudoku._explain((False, False, False)) == "no checks"
+    assert sudoku._tier((False, False, False), {}) is None
+
+
+def test_explain_brute_force_only():
+    assert _solve("0" * 81)[0] == (False, False, True)
+    assert sudoku._explain((False, False, True)) == "brute_force"
+    assert sudoku._tier((False, False, True), {}) == "brute_force"
+
+
+def test_explain_names_every_level():
+    assert sudoku._explain((True, True, True)) == (
+        "initial_checks, advanced_checks and brute_force"
+    )
+    assert sudoku._explain((True, False, False), {"x_wing": 2}) == (
+        "initial_checks and expert_checks (x_wing 2)"
+    )
+    assert sudoku._explain(None) == "dancing links"
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        [],
+        ["-q"],
+        ["in.sdk"],
+        ["in.sdk", "out.sdk"],
+        ["-", "-"],
+        ["--quiet", "in.sdk", "out.sdk"],
+        ["in.sdk", "-", "-q"],
+        ["-q", "in.sdk", "-q"],
+        ["in.sdk", "-q", "out.sdk"],
+        ["in.sdk", "--workers", "2"],
+    ],
+)
+def test_fast_args_match_parse_args(argv):
+    fast = sudoku._fast_args(argv)
+    try:
+        parsed = sudoku._parse_args(argparse.ArgumentParser(), argv)
+    except SystemExit:
+        parsed = None
+
+    if fast is not None:
+        assert parsed is not None and vars(fast) == vars(parsed)
+
+
+@pytest.mark.parametrize("options", [[], ["--workers", "2", "--chunk-size", "2"]])
+def test_skip_invalid_keeps_lines_in_step(tmp_path, options):
+    lines = [SOLVED, "12345", "11" + "0" * 79, "0" * 81, "x" * 81]
+    in_path, out_path = tmp_path / "in.sdk", tmp_path / "out.sdk"
+    in_path.write_text("".join(line + "\n" for line in lines))
+
+    subprocess.run(
+        [sys.executable, sudoku.__file__, str(in_path), str(out_path), "-q"]
+        + ["--skip-invalid"]
+        + options,
+        check=True,
+        capture_output=True,
+    )
+
+    output = out_path.read_text().splitlines()
+    assert len(output) == len(lines)
+    assert output[0] == SOLVED
+    assert output[1:3] == ["invalid", "invalid"]
+    assert output[4] == "invalid"